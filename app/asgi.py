@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+from core.asyncviews import AsyncURLConfASGIHandler  # noqa: E402
+
+# Resuelve las rutas con ASGI_URLCONF, donde las vistas son asincronas
+application = AsyncURLConfASGIHandler()
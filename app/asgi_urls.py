@@ -0,0 +1,12 @@
+"""
+URL configuration used under ASGI.
+
+Same routes as app.urls, with every view wrapped by core.asyncviews.async_view
+so read requests run concurrently in the thread pool instead of queueing on
+the single thread Django 3.2 uses for synchronous views.
+"""
+from core.asyncviews import async_patterns
+
+from app.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = async_patterns(sync_urlpatterns)
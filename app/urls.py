@@ -3,8 +3,16 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import recipe_thumbnail
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
-    path('api/recipe/', include('recipe.urls'))
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_URL)
+    path('api/recipe/', include('recipe.urls')),
+    # Antes de static() para que no lo tape el servidor de archivos de MEDIA_URL
+    path(
+        f"{settings.MEDIA_URL.lstrip('/')}recipe/<slug:key>/<int:width>x<int:height>.<str:ext>",
+        recipe_thumbnail,
+        name='recipe-thumbnail'
+    ),
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
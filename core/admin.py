@@ -30,3 +30,4 @@ admin.site.register(models.Tag)
 admin.site.register(models.Ingredient)
 admin.site.register(models.Recipe)
 
+admin.site.register(models.ImageJob)
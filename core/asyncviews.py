@@ -0,0 +1,71 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.http import FileResponse, HttpResponse
+from django.urls import URLPattern, URLResolver
+
+from core.metrics import timed, track_queries
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _run_view(view, request, *args, **kwargs):
+    """ Ejecuta la vista en un hilo del pool y deja la respuesta lista para enviar """
+    close_old_connections()
+    try:
+        with track_queries():
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                with timed('render'):
+                    response = response.render()
+            if response.streaming and not isinstance(response, FileResponse):
+                # Django 3.2 recorre los flujos dentro del event loop, donde el ORM no esta permitido
+                buffered = HttpResponse(b''.join(response.streaming_content), status=response.status_code)
+                for header, value in response.items():
+                    buffered[header] = value
+                response.close()
+                response = buffered
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_view(view):
+    """ Version asincrona de una vista sincrona: las lecturas corren en el pool de hilos en paralelo """
+    run_read = sync_to_async(functools.partial(_run_view, view), thread_sensitive=False)
+    run_write = sync_to_async(functools.partial(_run_view, view), thread_sensitive=True)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await run_read(request, *args, **kwargs)
+        return await run_write(request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_patterns(patterns):
+    """ Copia de las rutas con sus vistas convertidas por async_view """
+    converted = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            converted.append(URLResolver(
+                pattern.pattern, async_patterns(pattern.url_patterns),
+                pattern.default_kwargs, pattern.app_name, pattern.namespace
+            ))
+        else:
+            converted.append(URLPattern(
+                pattern.pattern, async_view(pattern.callback), pattern.default_args, pattern.name
+            ))
+    return converted
+
+
+class AsyncURLConfASGIHandler(ASGIHandler):
+    """ ASGIHandler que resuelve las rutas con ASGI_URLCONF """
+
+    async def get_response_async(self, request):
+        request.urlconf = settings.ASGI_URLCONF
+        return await super().get_response_async(request)
@@ -0,0 +1,103 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+class LocalTTLCache:
+    """ Cache LRU en memoria del proceso con expiracion por tiempo """
+    def __init__(self, max_size=10000, timeout=300):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """ Retorna el valor si existe y no ha expirado """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """ Guarda el valor descartando el menos usado si esta lleno """
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCache:
+    """ Adaptador para usar un cache del framework de Django """
+    def __init__(self, alias='default', timeout=300):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+def _build_token_cache():
+    """ Construye el cache de tokens segun el setting TOKEN_AUTH_CACHE """
+    options = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+    timeout = options.get('TIMEOUT', 300)
+    if options.get('BACKEND', 'local') == 'django':
+        return DjangoCache(options.get('CACHE_ALIAS', 'default'), timeout)
+    return LocalTTLCache(options.get('MAX_SIZE', 10000), timeout)
+
+
+token_cache = _build_token_cache()
+
+
+def _cache_key(key):
+    """ No guardar la llave del token en claro dentro del cache """
+    return 'authtoken:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    """ Elimina un token del cache """
+    token_cache.delete(_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """ Autenticacion por token que evita consultar la base de datos en cada peticion """
+
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        token = token_cache.get(cache_key)
+        if token is not None:
+            # Cada peticion recibe su propia copia del usuario cacheado
+            return copy.copy(token.user), token
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(cache_key, token)
+        return user, token
@@ -0,0 +1,63 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+UserModel = get_user_model()
+
+
+def unknown_user_key(username):
+    return 'auth-unknown:' + hashlib.sha256(username.encode()).hexdigest()
+
+
+def unknown_user_cache():
+    """ Cache compartido de emails inexistentes, o None si no hay uno configurado """
+    alias = getattr(settings, 'AUTH_UNKNOWN_USER_CACHE_ALIAS', None)
+    if alias is None:
+        return None
+    cache = caches[alias]
+    # Un registro en otro proceso no borraria la entrada de un cache en memoria
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured('AUTH_UNKNOWN_USER_CACHE_ALIAS must name a cache shared between processes.')
+    return cache
+
+
+def forget_unknown_user(username):
+    """ Quitar del cache negativo un email que ahora existe """
+    cache = unknown_user_cache()
+    if cache is not None:
+        cache.delete(unknown_user_key(username))
+
+
+class CachedEmailBackend(ModelBackend):
+    """ ModelBackend que recuerda los emails inexistentes en un cache compartido para no consultarlos de nuevo """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        cache = unknown_user_cache()
+        key = unknown_user_key(username)
+        if cache is not None and cache.get(key):
+            # Mantener el mismo tiempo de respuesta que un usuario existente
+            UserModel().set_password(password)
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            if cache is not None:
+                cache.set(key, True, getattr(settings, 'AUTH_UNKNOWN_USER_CACHE_TIMEOUT', 300))
+            UserModel().set_password(password)
+            return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,49 @@
+import os
+import statistics
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def throwaway_database(file_backed=False):
+    """ Crea una base de datos de prueba para medir sin tocar la de desarrollo """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    path = None
+    if file_backed and connection.vendor == 'sqlite':
+        # Una base en memoria no refleja el journal ni la concurrencia entre conexiones
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        test_settings['NAME'] = path
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        if path:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+
+def summarize(timings):
+    """ Resumen en milisegundos de una lista de duraciones en segundos """
+    if not timings:
+        return {'count': 0}
+    ordered = sorted(t * 1000 for t in timings)
+
+    def percentile(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 3)
+
+    return {
+        'count': len(ordered),
+        'mean': round(statistics.mean(ordered), 3),
+        'p50': percentile(50),
+        'p95': percentile(95),
+        'p99': percentile(99),
+        'max': round(ordered[-1], 3),
+    }
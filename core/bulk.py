@@ -0,0 +1,80 @@
+from collections import Counter
+
+from django.db import connections, transaction
+
+from core.models import Recipe
+from core.search import index_recipes
+from core.summaries import SUMMARY_FIELDS
+from core.versioning import bump_data_version, reserve_data_versions
+
+# Nombres por consulta, por debajo del limite de variables de SQLite
+NAME_BATCH_SIZE = 500
+
+
+def create_names(model, user, names, using='default'):
+    """ Tags o ingredientes del usuario por nombre, creando los que faltan con un bulk_create """
+    names = list(dict.fromkeys(names))
+    objects = {}
+    with transaction.atomic(using=using):
+        for start in range(0, len(names), NAME_BATCH_SIZE):
+            batch = names[start:start + NAME_BATCH_SIZE]
+            objects.update((obj.name, obj) for obj in model.objects.using(using).filter(user=user, name__in=batch))
+            missing = [name for name in batch if name not in objects]
+            if not missing:
+                continue
+            # bulk_create no llama a save(): el numero de cambio se toma aqui, en la misma transaccion
+            change_seq = bump_data_version(user.pk, using)
+            # La restriccion unica (user, name) resuelve las creaciones concurrentes
+            model.objects.using(using).bulk_create(
+                [model(user=user, name=name, change_seq=change_seq) for name in missing], ignore_conflicts=True
+            )
+            objects.update(
+                (obj.name, obj) for obj in model.objects.using(using).filter(user=user, name__in=missing)
+            )
+    return objects
+
+
+def _insert_recipes(recipes, using, batch_size):
+    """ Inserta las recetas y les asigna su id aunque el backend no los retorne """
+    Recipe.objects.using(using).bulk_create(recipes, batch_size=batch_size)
+    if connections[using].features.can_return_rows_from_bulk_insert:
+        return
+    # Cada receta tiene un numero de cambio propio de su dueño: (user, change_seq) la identifica
+    ids = {}
+    for user_id in {recipe.user_id for recipe in recipes}:
+        seqs = [recipe.change_seq for recipe in recipes if recipe.user_id == user_id]
+        ids.update(
+            ((user_id, change_seq), pk) for change_seq, pk in
+            Recipe.objects.using(using).filter(user_id=user_id, change_seq__range=(min(seqs), max(seqs)))
+            .values_list('change_seq', 'id')
+        )
+    for recipe in recipes:
+        recipe.pk = ids[recipe.user_id, recipe.change_seq]
+
+
+def create_recipes(recipes, relations, batch_size=None, using='default'):
+    """ Inserta recetas sin guardar con los ids de sus tags e ingredientes, en lote y en una transaccion """
+    with transaction.atomic(using=using):
+        # bulk_create no llama a save() ni envia señales: cada receta toma aqui un numero de cambio distinto
+        counts = Counter(recipe.user_id for recipe in recipes)
+        next_seqs = {
+            user_id: reserve_data_versions(user_id, count, using) - count + 1 for user_id, count in counts.items()
+        }
+        # Las columnas desnormalizadas se llenan aqui: bulk_create no envia m2m_changed
+        for recipe, related in zip(recipes, relations):
+            for name, field in SUMMARY_FIELDS.items():
+                setattr(recipe, field, sorted(set(related.get(name, ()))))
+            recipe.ingredient_count = len(recipe.ingredient_ids)
+            recipe.change_seq = next_seqs[recipe.user_id]
+            next_seqs[recipe.user_id] += 1
+        _insert_recipes(recipes, using, batch_size)
+
+        for name, field in SUMMARY_FIELDS.items():
+            through = getattr(Recipe, name).through
+            column = f'{Recipe._meta.get_field(name).related_model._meta.model_name}_id'
+            through.objects.using(using).bulk_create(
+                (through(recipe_id=recipe.pk, **{column: pk}) for recipe in recipes for pk in getattr(recipe, field)),
+                batch_size=batch_size
+            )
+        index_recipes([recipe.pk for recipe in recipes], using=using)
+    return recipes
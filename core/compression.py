@@ -0,0 +1,128 @@
+import gzip
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def compression_options():
+    options = {
+        'MIN_SIZE': 1024,
+        'ALGORITHMS': ('zstd', 'br', 'gzip'),
+        # Solo formatos de la API: las paginas HTML llevan el token CSRF, y comprimirlas lo expone a BREACH
+        'CONTENT_TYPES': ('application/json', 'application/msgpack', 'application/x-ndjson'),
+        'GZIP_LEVEL': 6,
+        'BROTLI_QUALITY': 5,
+        'ZSTD_LEVEL': 3,
+    }
+    options.update(getattr(settings, 'RESPONSE_COMPRESSION', {}))
+    return options
+
+
+class GzipCodec:
+    """ gzip de la libreria estandar, siempre disponible """
+    name = 'gzip'
+
+    def __init__(self, options):
+        self.level = options['GZIP_LEVEL']
+
+    def compress(self, data):
+        return gzip.compress(data, self.level, mtime=0)
+
+    def stream(self, chunks):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class BrotliCodec:
+    """ Brotli, si esta instalado el paquete brotli """
+    name = 'br'
+
+    def __init__(self, options):
+        self.quality = options['BROTLI_QUALITY']
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.quality)
+
+    def stream(self, chunks):
+        compressor = brotli.Compressor(quality=self.quality)
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+class ZstdCodec:
+    """ Zstandard, si esta instalado el paquete zstandard """
+    name = 'zstd'
+
+    def __init__(self, options):
+        self.level = options['ZSTD_LEVEL']
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def stream(self, chunks):
+        compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def available_codecs():
+    """ Algoritmos cuya libreria esta instalada, por nombre de Content-Encoding """
+    codecs = {'gzip': GzipCodec}
+    if brotli is not None:
+        codecs['br'] = BrotliCodec
+    if zstandard is not None:
+        codecs['zstd'] = ZstdCodec
+    return codecs
+
+
+def parse_accept_encoding(header):
+    """ Peso q de cada codificacion aceptada por el cliente """
+    weights = {}
+    for item in header.split(','):
+        name, *params = [part.strip() for part in item.split(';')]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.lower()] = q
+    return weights
+
+
+def negotiate_codec(header, options):
+    """ Codec con mayor q entre los soportados; a igual q decide el orden de ALGORITHMS """
+    weights = parse_accept_encoding(header or '')
+    codecs = available_codecs()
+    best, best_q = None, 0.0
+    for name in options['ALGORITHMS']:
+        if name not in codecs:
+            continue
+        q = weights.get(name, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return codecs[best](options) if best else None
@@ -0,0 +1,97 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+ENGINES = {
+    'postgres': 'django.db.backends.postgresql',
+    'postgresql': 'django.db.backends.postgresql',
+    'pgsql': 'django.db.backends.postgresql',
+    'mysql': 'django.db.backends.mysql',
+    'sqlite': 'django.db.backends.sqlite3',
+}
+
+REPLICA_ALIAS = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def parse_database_url(url, conn_max_age=0, conn_health_checks=False):
+    """ Convierte un DATABASE_URL en un diccionario de DATABASES """
+    parts = urlsplit(url)
+    if parts.scheme not in ENGINES:
+        raise ImproperlyConfigured(f'Unsupported database scheme: {parts.scheme!r}')
+
+    config = {
+        'ENGINE': ENGINES[parts.scheme],
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': conn_health_checks,
+        'OPTIONS': dict(parse_qsl(parts.query)),
+    }
+    if parts.scheme == 'sqlite':
+        # sqlite:///relative.db, sqlite:////absolute.db, sqlite:// en memoria
+        path = unquote(parts.path)
+        config['NAME'] = path[1:] if path else ':memory:'
+        return config
+
+    config.update({
+        'NAME': unquote(parts.path.lstrip('/')),
+        'USER': unquote(parts.username or ''),
+        'PASSWORD': unquote(parts.password or ''),
+        'HOST': parts.hostname or '',
+        'PORT': str(parts.port or ''),
+    })
+    return config
+
+
+@contextmanager
+def read_from_replica():
+    """ Envia las lecturas del bloque a la replica, si esta configurada """
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """ Lecturas a la replica solo dentro de read_from_replica, escrituras a default """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and REPLICA_ALIAS in settings.DATABASES:
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_ALIAS:
+            return False
+        return None
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """ Ajusta cada conexion SQLite con los PRAGMA de SQLITE_PRAGMAS """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def close_unusable_connections(**kwargs):
+    """ Descarta al inicio de cada peticion las conexiones persistentes caidas """
+    from django.db import connections
+
+    for conn in connections.all():
+        if conn.connection is None or not conn.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if not conn.is_usable():
+            conn.close()
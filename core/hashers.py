@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, BCryptSHA256PasswordHasher, PBKDF2PasswordHasher
+)
+
+
+def _option(name, default):
+    return getattr(settings, 'PASSWORD_HASHER_OPTIONS', {}).get(name, default)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """ PBKDF2 con iteraciones configurables """
+    @property
+    def iterations(self):
+        return _option('PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """ Argon2 con costo de tiempo, memoria y paralelismo configurables """
+    @property
+    def time_cost(self):
+        return _option('ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _option('ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _option('ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class TunedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    """ BCrypt con rondas configurables """
+    @property
+    def rounds(self):
+        return _option('BCRYPT_ROUNDS', BCryptSHA256PasswordHasher.rounds)
@@ -0,0 +1,140 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from core.models import ImageJob, Recipe
+from core.versioning import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def rendition_formats():
+    """ Formatos configurados que soporta la instalacion de Pillow """
+    formats = getattr(settings, 'RECIPE_IMAGE_FORMATS', ('webp', 'jpeg'))
+    return [fmt for fmt in formats if fmt != 'webp' or features.check('webp')]
+
+
+def render_image(image, size, fmt, quality=None):
+    """ Redimensiona una imagen abierta y la codifica sin metadatos """
+    image = ImageOps.exif_transpose(image)
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    image = image.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    # Sin EXIF, ICC ni comentarios del original
+    image.info = {}
+
+    buffer = io.BytesIO()
+    quality = quality or getattr(settings, 'RECIPE_IMAGE_QUALITY', 82)
+    image.save(buffer, format=fmt.upper(), quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def rendition_name(source, label, fmt):
+    """ Ruta de una rendicion derivada de la imagen original """
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return f'uploads/recipe/renditions/{stem}/{label}.{FORMAT_EXTENSIONS[fmt]}'
+
+
+def generate_renditions(source):
+    """ Genera las rendiciones configuradas que faltan y retorna sus rutas """
+    sizes = getattr(settings, 'RECIPE_IMAGE_RENDITIONS', {'small': (320, 320)})
+    renditions = {
+        f'{label}_{fmt}': rendition_name(source, label, fmt)
+        for label in sizes for fmt in rendition_formats()
+    }
+    # El original puede ser de varias recetas: las rendiciones existentes ya se sirven y no se reescriben
+    missing = [key for key, name in renditions.items() if not default_storage.exists(name)]
+    if not missing:
+        return renditions
+
+    with default_storage.open(source, 'rb') as fp:
+        with Image.open(fp) as image:
+            image.load()
+            for label, size in sizes.items():
+                for fmt in rendition_formats():
+                    key = f'{label}_{fmt}'
+                    if key in missing:
+                        content = ContentFile(render_image(image, size, fmt))
+                        renditions[key] = default_storage.save(renditions[key], content)
+    return renditions
+
+
+def process_image_job(job_id):
+    """ Procesa un trabajo pendiente, ignorando los que ya fueron tomados """
+    claimed = ImageJob.objects.filter(pk=job_id, status=ImageJob.PENDING).update(
+        status=ImageJob.PROCESSING
+    )
+    if not claimed:
+        return
+    job = ImageJob.objects.get(pk=job_id)
+
+    try:
+        renditions = generate_renditions(job.source)
+    except Exception as exc:
+        logger.exception('Processing image %s failed', job.source)
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=ImageJob.FAILED, error=str(exc), finished_at=timezone.now()
+        )
+        return
+
+    # Si la imagen fue reemplazada mientras tanto, el nuevo trabajo publica sus rendiciones
+    with transaction.atomic():
+        Recipe.objects.filter(pk=job.recipe_id, image=job.source).update(
+            image_renditions=renditions, updated_at=timezone.now(),
+            change_seq=bump_data_version(job.recipe.user_id)
+        )
+    ImageJob.objects.filter(pk=job.pk).update(status=ImageJob.DONE, finished_at=timezone.now())
+
+
+def _run_job(job_id):
+    """ Ejecuta un trabajo dentro de un hilo del pool """
+    close_old_connections()
+    try:
+        process_image_job(job_id)
+    except Exception:
+        logger.exception('Image job %s crashed', job_id)
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    """ Pool de hilos compartido para procesar imagenes """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-image'
+            )
+        return _executor
+
+
+def submit_image_job(job_id):
+    """ Envia un trabajo al pool si hay trabajadores en el proceso """
+    if getattr(settings, 'RECIPE_IMAGE_WORKERS', 0) > 0:
+        get_executor().submit(_run_job, job_id)
+
+
+def enqueue_image_job(recipe):
+    """ Registra el trabajo y lo envia al pool cuando la transaccion confirma """
+    job = ImageJob.objects.create(recipe=recipe, source=recipe.image.name)
+    transaction.on_commit(lambda: submit_image_job(job.pk))
+    return job
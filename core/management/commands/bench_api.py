@@ -0,0 +1,308 @@
+import asyncio
+import io
+import itertools
+import json
+import logging
+import random
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework.throttling import SimpleRateThrottle
+
+from core.benchmarks import summarize, throwaway_database
+from core.models import Ingredient, Recipe, Tag
+from core.search import index_recipes
+from core.summaries import refresh_recipe_summaries
+
+PASSWORD = 'benchpass'
+
+
+def sample_image():
+    """ Imagen JPEG pequeña para el endpoint de subida """
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), 'orange').save(buffer, format='JPEG')
+    buffer.seek(0)
+    buffer.name = 'bench.jpg'
+    return buffer
+
+
+class Command(BaseCommand):
+    """ Mide latencia, consultas y rendimiento de cada endpoint del API """
+    help = 'Seed a throwaway database and benchmark every recipe and user endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--recipes', type=int, default=1000, help='Recipes per user.')
+        parser.add_argument('--tags', type=int, default=50, help='Tags per user.')
+        parser.add_argument('--ingredients', type=int, default=100, help='Ingredients per user.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Client threads per endpoint.')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Only run the named endpoint; may be repeated.')
+        parser.add_argument('--response-cache', action='store_true',
+                            help='Keep the rendered list cache enabled.')
+        parser.add_argument('--server', choices=('wsgi', 'asgi', 'both'), default='wsgi',
+                            help='Drive the views through the WSGI handler with client threads, '
+                                 'the ASGI handler and async views with concurrent tasks, or both.')
+        parser.add_argument('--output', help='Write the JSON report to this file.')
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        # Sin limites de login: el escenario 'user token' mide la creacion del token, no 429
+        throttle_rates = {scope: None for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']}
+        overrides = {
+            'MEDIA_ROOT': media_root,
+            'RECIPE_IMAGE_WORKERS': 0,
+            'REST_FRAMEWORK': {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': throttle_rates},
+        }
+        if not options['response_cache']:
+            overrides['API_RESPONSE_CACHE'] = {'MAX_BODY_SIZE': -1}
+
+        # Los errores 5xx se reportan en el resultado, no como trazas
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        setup_test_environment()
+        try:
+            # DRF copia las tasas a SimpleRateThrottle al importarse
+            with override_settings(**overrides), patch.object(SimpleRateThrottle, 'THROTTLE_RATES', throttle_rates), \
+                    throwaway_database(file_backed=True):
+                users = self.seed(options)
+                connection.close()
+                # Numera los datos generados sin repetir nombres entre servidores
+                self.sequence = itertools.count()
+                report = self.run(users, options)
+        finally:
+            teardown_test_environment()
+            request_logger.setLevel(log_level)
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fp:
+                fp.write(output)
+        self.stdout.write(output)
+
+    def seed(self, options):
+        """ Crear usuarios, tokens, tags, ingredientes y recetas con bulk_create """
+        User = get_user_model()
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            User(email=f'bench{i}@example.com', name=f'Bench {i}', password=password)
+            for i in range(options['users'])
+        )
+        users = list(User.objects.filter(email__startswith='bench').order_by('id'))
+        Token.objects.bulk_create(Token(user=user, key=Token.generate_key()) for user in users)
+
+        for user in users:
+            Tag.objects.bulk_create(Tag(user=user, name=f'tag {i}') for i in range(options['tags']))
+            Ingredient.objects.bulk_create(
+                Ingredient(user=user, name=f'ingredient {i}') for i in range(options['ingredients'])
+            )
+            Recipe.objects.bulk_create(
+                (Recipe(user=user, title=f'recipe {i}', time_minutes=random.randint(5, 120),
+                        price=random.randint(100, 9999) / 100)
+                 for i in range(options['recipes'])),
+                batch_size=1000
+            )
+
+            tag_ids = list(Tag.objects.filter(user=user).values_list('id', flat=True))
+            ingredient_ids = list(Ingredient.objects.filter(user=user).values_list('id', flat=True))
+            recipe_ids = list(Recipe.objects.filter(user=user).values_list('id', flat=True))
+            Recipe.tags.through.objects.bulk_create(
+                (Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                 for recipe_id in recipe_ids
+                 for tag_id in random.sample(tag_ids, min(3, len(tag_ids)))),
+                batch_size=5000
+            )
+            Recipe.ingredients.through.objects.bulk_create(
+                (Recipe.ingredients.through(recipe_id=recipe_id, ingredient_id=ingredient_id)
+                 for recipe_id in recipe_ids
+                 for ingredient_id in random.sample(ingredient_ids, min(8, len(ingredient_ids)))),
+                batch_size=5000
+            )
+            # bulk_create no envia señales: completar lo que el API mantiene al escribir
+            refresh_recipe_summaries(recipe_ids, touch=False)
+            index_recipes(recipe_ids)
+
+        return [
+            {
+                'user': user,
+                'token': user.auth_token.key,
+                'tag_ids': list(Tag.objects.filter(user=user).values_list('id', flat=True)[:10]),
+                'recipe_ids': list(Recipe.objects.filter(user=user).values_list('id', flat=True)),
+            }
+            for user in users
+        ]
+
+    def scenarios(self):
+        """ Endpoints a medir: nombre, metodo, ruta, cuerpo y formato; ruta y cuerpo dependen del usuario y del contador """
+        recipes = reverse('recipe:recipe-list')
+
+        def recipe_detail(ctx, i):
+            return reverse('recipe:recipe-detail', args=[random.choice(ctx['recipe_ids'])])
+
+        def recipe_payload(ctx, i):
+            return {'title': f'bench {i}', 'time_minutes': 10, 'price': '5.00',
+                    'tags': ctx['tag_ids'][:2], 'ingredients': []}
+
+        return [
+            ('tag list', 'get', lambda ctx, i: reverse('recipe:tag-list'), None, None),
+            ('tag create', 'post', lambda ctx, i: reverse('recipe:tag-list'),
+             lambda ctx, i: {'name': f'bench tag {i}'}, 'json'),
+            ('ingredient list', 'get', lambda ctx, i: reverse('recipe:ingredient-list'), None, None),
+            ('ingredient create', 'post', lambda ctx, i: reverse('recipe:ingredient-list'),
+             lambda ctx, i: {'name': f'bench ingredient {i}'}, 'json'),
+            ('recipe list', 'get', lambda ctx, i: recipes, None, None),
+            ('recipe list filtered', 'get',
+             lambda ctx, i: f"{recipes}?tags={','.join(map(str, ctx['tag_ids'][:3]))}", None, None),
+            ('recipe detail', 'get', recipe_detail, None, None),
+            ('recipe create', 'post', lambda ctx, i: recipes, recipe_payload, 'json'),
+            ('recipe update', 'patch', recipe_detail, lambda ctx, i: {'time_minutes': i % 100 + 1}, 'json'),
+            ('recipe bulk create', 'post', lambda ctx, i: reverse('recipe:recipe-bulk-create'),
+             lambda ctx, i: [recipe_payload(ctx, f'{i}-{n}') for n in range(10)], 'json'),
+            ('recipe upload image', 'post',
+             lambda ctx, i: reverse('recipe:recipe-upload-image', args=[random.choice(ctx['recipe_ids'])]),
+             lambda ctx, i: {'image': sample_image()}, 'multipart'),
+            ('user create', 'post', lambda ctx, i: reverse('user:create'),
+             lambda ctx, i: {'email': f'new{i}@example.com', 'password': PASSWORD, 'name': 'New'}, 'json'),
+            ('user token', 'post', lambda ctx, i: reverse('user:token'),
+             lambda ctx, i: {'email': ctx['user'].email, 'password': PASSWORD}, 'json'),
+            ('user me', 'get', lambda ctx, i: reverse('user:me'), None, None),
+            ('user me update', 'patch', lambda ctx, i: reverse('user:me'),
+             lambda ctx, i: {'name': f'Bench {i}'}, 'json'),
+        ]
+
+    def run(self, users, options):
+        """ Ejecuta cada endpoint con varios clientes concurrentes en cada servidor pedido """
+        report = {
+            'config': {key: options[key] for key in
+                       ('users', 'recipes', 'tags', 'ingredients', 'requests', 'concurrency', 'response_cache',
+                        'server')},
+            'vendor': connection.vendor,
+        }
+        servers = ('wsgi', 'asgi') if options['server'] == 'both' else (options['server'],)
+        for server in servers:
+            key = 'endpoints' if server == 'wsgi' else 'asgi_endpoints'
+            report[key] = {}
+            for name, method, path, data, fmt in self.scenarios():
+                if options['endpoints'] and name not in options['endpoints']:
+                    continue
+                if server == 'wsgi':
+                    result = self.run_endpoint(users, method, path, data, fmt, options)
+                elif fmt == 'multipart':
+                    # El AsyncClient de Django 3.2 lee de mas al procesar cuerpos multipart
+                    report[key][name] = {'skipped': 'multipart bodies are not supported by AsyncClient'}
+                    continue
+                else:
+                    with override_settings(ROOT_URLCONF=settings.ASGI_URLCONF):
+                        result = asyncio.run(self.run_endpoint_async(users, method, path, data, fmt, options))
+                report[key][name] = result
+                self.stderr.write(f"{server} {name}: {result['throughput']} req/s")
+        return report
+
+    def run_endpoint(self, users, method, path, data, fmt, options):
+        """ Mide un endpoint: latencias, consultas por peticion y errores """
+        counter = itertools.count()
+        lock = threading.Lock()
+        timings, queries, errors = [], [], []
+
+        def worker():
+            # Los errores del servidor se cuentan, no detienen el hilo
+            client = APIClient(raise_request_exception=False)
+            local_timings, local_queries, local_errors = [], [], 0
+            try:
+                while True:
+                    with lock:
+                        i = next(counter)
+                    if i >= options['requests']:
+                        return
+                    ctx = users[i % len(users)]
+                    n = next(self.sequence)
+                    client.credentials(HTTP_AUTHORIZATION=f"Token {ctx['token']}")
+                    kwargs = {'format': fmt} if fmt else {}
+                    if data is not None:
+                        kwargs['data'] = data(ctx, n)
+
+                    with CaptureQueriesContext(connection) as captured:
+                        start = time.perf_counter()
+                        response = getattr(client, method)(path(ctx, n), **kwargs)
+                        if response.streaming:
+                            b''.join(response.streaming_content)
+                        local_timings.append(time.perf_counter() - start)
+                    local_queries.append(len(captured.captured_queries))
+                    if response.status_code >= 400:
+                        local_errors += 1
+            finally:
+                connection.close()
+                with lock:
+                    timings.extend(local_timings)
+                    queries.extend(local_queries)
+                    errors.append(local_errors)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            'latency_ms': summarize(timings),
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else 0,
+            'throughput': round(len(timings) / elapsed, 1),
+            'errors': sum(errors),
+        }
+
+    async def run_endpoint_async(self, users, method, path, data, fmt, options):
+        """ Mide un endpoint a traves del handler ASGI con tareas concurrentes en un solo event loop """
+        counter = itertools.count()
+        timings, errors = [], []
+
+        async def worker():
+            client = AsyncClient(raise_request_exception=False)
+            while True:
+                i = next(counter)
+                if i >= options['requests']:
+                    return
+                ctx = users[i % len(users)]
+                n = next(self.sequence)
+                # El AsyncClient de Django 3.2 toma las cabeceras por su nombre HTTP
+                kwargs = {'Authorization': f"Token {ctx['token']}"}
+                if data is not None:
+                    payload = data(ctx, n)
+                    if fmt == 'json':
+                        kwargs.update(data=json.dumps(payload), content_type='application/json')
+
+                start = time.perf_counter()
+                response = await getattr(client, method)(path(ctx, n), **kwargs)
+                timings.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors.append(i)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+        elapsed = time.perf_counter() - started
+
+        return {
+            'latency_ms': summarize(timings),
+            # Las consultas corren en los hilos de las vistas, fuera del alcance de CaptureQueriesContext
+            'queries_per_request': None,
+            'throughput': round(len(timings) / elapsed, 1),
+            'errors': len(errors),
+        }
@@ -0,0 +1,103 @@
+import json
+import random
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.test import override_settings
+
+from core.benchmarks import summarize, throwaway_database
+from core.models import Recipe, Tag
+
+PRAGMA_MODES = {
+    'default': {},
+    'tuned': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000},
+}
+
+
+class Command(BaseCommand):
+    """ Mide lecturas y escrituras concurrentes sobre la base de datos configurada """
+    help = 'Benchmark concurrent read/write throughput of the configured database backend.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--write-ratio', type=float, default=0.2,
+                            help='Fraction of operations that insert a recipe.')
+        parser.add_argument('--rows', type=int, default=10000,
+                            help='Recipes and tags seeded before measuring.')
+        parser.add_argument('--sqlite-pragmas', choices=sorted(PRAGMA_MODES), default='tuned',
+                            help='PRAGMA set applied to SQLite connections.')
+
+    def handle(self, *args, **options):
+        with override_settings(SQLITE_PRAGMAS=PRAGMA_MODES[options['sqlite_pragmas']]):
+            with throwaway_database(file_backed=True):
+                user = self.seed(options['rows'])
+                connection.close()
+                result = self.run(user, options)
+
+        result.update({
+            'vendor': connection.vendor,
+            'sqlite_pragmas': options['sqlite_pragmas'] if connection.vendor == 'sqlite' else None,
+            'threads': options['threads'],
+            'write_ratio': options['write_ratio'],
+        })
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def seed(self, rows):
+        """ Crear un usuario con tags y recetas """
+        user = get_user_model().objects.create_user('bench@example.com', 'benchpass')
+        Tag.objects.bulk_create((Tag(user=user, name=f'tag {i}') for i in range(rows)), batch_size=5000)
+        Recipe.objects.bulk_create(
+            (Recipe(user=user, title=f'recipe {i}', time_minutes=10, price=5) for i in range(rows)),
+            batch_size=5000
+        )
+        return user
+
+    def run(self, user, options):
+        """ Ejecutar los hilos hasta el tiempo limite y juntar sus tiempos """
+        reads, writes, errors = [], [], []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+
+        def worker():
+            local_reads, local_writes, local_errors = [], [], 0
+            try:
+                while time.perf_counter() < deadline:
+                    is_write = random.random() < options['write_ratio']
+                    start = time.perf_counter()
+                    try:
+                        if is_write:
+                            with transaction.atomic():
+                                Recipe.objects.create(user=user, title='bench', time_minutes=1, price=1)
+                        else:
+                            list(Tag.objects.filter(user=user).order_by('name', 'id')[:101])
+                            list(Recipe.objects.filter(user=user).order_by('id')[:101])
+                    except DatabaseError:
+                        local_errors += 1
+                        continue
+                    (local_writes if is_write else local_reads).append(time.perf_counter() - start)
+            finally:
+                connection.close()
+                with lock:
+                    reads.extend(local_reads)
+                    writes.extend(local_writes)
+                    errors.append(local_errors)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            'seconds': round(elapsed, 3),
+            'ops_per_second': round((len(reads) + len(writes)) / elapsed, 1),
+            'reads_ms': summarize(reads),
+            'writes_ms': summarize(writes),
+            'errors': sum(errors),
+        }
@@ -0,0 +1,109 @@
+import datetime
+import decimal
+import gc
+import io
+import json
+import time
+import tracemalloc
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmarks import summarize
+from core.models import Recipe
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer, orjson
+from recipe.serializers import RecipeSerializer
+
+RENDERERS = {
+    'drf': JSONRenderer,
+    'orjson': ORJSONRenderer,
+}
+
+PARSERS = {
+    'drf': JSONParser,
+    'orjson': ORJSONParser,
+}
+
+
+class Command(BaseCommand):
+    """ Compara la codificacion JSON de DRF con la de orjson sobre listados de recetas """
+    help = 'Benchmark encode/decode time and allocations of the JSON renderers and parsers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000,
+                            help='Recipes in the encoded payload.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Times each renderer and parser is run.')
+
+    def handle(self, *args, **options):
+        payloads = self.payloads(options['recipes'])
+        result = {'orjson_installed': orjson is not None, 'recipes': options['recipes']}
+        for name, data in payloads.items():
+            result[name] = self.run(data, options['repeat'])
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def payloads(self, count):
+        """ Salida del serializador de listados y filas crudas con Decimal, fechas y UUID """
+        recipes = [
+            Recipe(
+                id=i, title=f'Receta {i} con ñandú', time_minutes=i % 120, price=decimal.Decimal(i % 10000) / 100,
+                link=f'https://example.com/{i}', tag_ids=[1, 2, 3], ingredient_ids=list(range(i % 12)),
+                ingredient_count=i % 12
+            )
+            for i in range(count)
+        ]
+        start = time.perf_counter()
+        serialized = RecipeSerializer(recipes, many=True, context={'summaries': True}).data
+        self.stderr.write(f'serialized {count} recipes in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        now = timezone.now()
+        rows = [
+            {
+                'id': i, 'uuid': uuid.UUID(int=i), 'price': decimal.Decimal(i % 10000) / 100,
+                'created_at': now - datetime.timedelta(minutes=i), 'day': now.date(),
+            }
+            for i in range(count)
+        ]
+        return {'serialized': serialized, 'raw': rows}
+
+    def measure(self, func, repeat):
+        """ Duraciones de func sin el recolector de basura, como hace timeit """
+        timings = []
+        for _ in range(repeat):
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+            finally:
+                gc.enable()
+        return timings
+
+    def run(self, data, repeat):
+        """ Tiempos de cada renderer y parser, y la memoria maxima asignada al codificar """
+        result = {}
+        for name, renderer_class in RENDERERS.items():
+            renderer = renderer_class()
+            content = renderer.render(data)
+            timings = self.measure(lambda: renderer.render(data), repeat)
+
+            tracemalloc.start()
+            renderer.render(data)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            parser = PARSERS[name]()
+            parse_timings = self.measure(lambda: parser.parse(io.BytesIO(content)), repeat)
+
+            result[name] = {
+                'bytes': len(content),
+                'encode_ms': summarize(timings),
+                'encode_peak_kib': round(peak / 1024, 1),
+                'decode_ms': summarize(parse_timings),
+            }
+        return result
@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from core.benchmarks import throwaway_database
+from core.models import Tag, Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    """ Mide la latencia de las consultas de listado sobre una base de datos de prueba """
+    help = 'Benchmark the per-user list queries against a seeded throwaway database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000,
+                            help='Rows to seed for each of tags, ingredients and recipes.')
+        parser.add_argument('--users', type=int, default=10,
+                            help='Number of users the rows are spread across.')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Times each query is executed.')
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--migrate-to', default=None,
+                            help='Core migration to roll back to before seeding, e.g. 0005_recipe_image '
+                                 'to measure the schema without the per-user indexes.')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            if options['migrate_to']:
+                call_command('migrate', 'core', options['migrate_to'], verbosity=0)
+            user = self.seed(options['rows'], options['users'])
+            self.run(user, options['repeat'], options['page_size'])
+
+    def seed(self, rows, users):
+        """ Crear usuarios y filas repartidas entre ellos, retorna el primer usuario """
+        User = get_user_model()
+        User.objects.bulk_create(
+            User(email=f'bench{i}@example.com', password='!') for i in range(users)
+        )
+        user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+        names = [f'name {i:07d}' for i in range(rows)]
+        random.shuffle(names)
+
+        for model in (Tag, Ingredient):
+            model.objects.bulk_create(
+                (model(user_id=user_ids[i % users], name=name) for i, name in enumerate(names)),
+                batch_size=5000
+            )
+        Recipe.objects.bulk_create(
+            (Recipe(user_id=user_ids[i % users], title=name, time_minutes=10, price=5)
+             for i, name in enumerate(names)),
+            batch_size=5000
+        )
+        self.stdout.write(f'Seeded {rows} rows per model across {users} users')
+        return User.objects.get(id=user_ids[0])
+
+    def run(self, user, repeat, page_size):
+        """ Ejecutar y medir cada consulta """
+        name = Tag.objects.filter(user=user).values_list('name', flat=True).last()
+        queries = {
+            'tag list': Tag.objects.filter(user=user).order_by('name', 'id')[:page_size + 1],
+            'ingredient list': Ingredient.objects.filter(user=user).order_by('name', 'id')[:page_size + 1],
+            'recipe list': Recipe.objects.filter(user=user).order_by('id')[:page_size + 1],
+            'tag by name': Tag.objects.filter(user=user, name=name),
+        }
+
+        for label, queryset in queries.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+
+            self.stdout.write(
+                f'{label:<16} median {statistics.median(timings):8.3f} ms  '
+                f'max {max(timings):8.3f} ms'
+            )
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f'    {line}')
@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.transfer import FORMATS, export_rows, export_user_file, write_rows
+
+
+class Command(BaseCommand):
+    """ Exporta recetas con sus tags e ingredientes por nombre, leyendo la base por bloques """
+    help = 'Export recipes as NDJSON or CSV, one file or one file per user in a directory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='emails', metavar='EMAIL',
+                            help='Export only this user; can be repeated. Defaults to every user.')
+        parser.add_argument('--output', default='-',
+                            help='File to write, "-" for stdout, or an existing directory to '
+                                 'write one <user id>.<format> file per user.')
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Defaults to the output file extension, or ndjson.')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Recipes read per query.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes exporting users in parallel; requires a directory output.')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or self.format_from_path(output)
+        users = get_user_model().objects.order_by('id')
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+            missing = set(options['emails']) - set(users.values_list('email', flat=True))
+            if missing:
+                raise CommandError(f'Unknown users: {", ".join(sorted(missing))}')
+
+        if os.path.isdir(output):
+            self.export_per_user(users, output, fmt, options)
+            return
+        if options['workers'] > 1:
+            raise CommandError('--workers requires --output to be a directory.')
+
+        if output == '-':
+            count = self.export(users, self.stdout, fmt, options['chunk_size'])
+        else:
+            with open(output, 'w', encoding='utf-8', newline='') as fp:
+                count = self.export(users, fp, fmt, options['chunk_size'])
+        self.stderr.write(f'Exported {count} recipes')
+
+    def format_from_path(self, path):
+        ext = os.path.splitext(path)[1].lstrip('.').lower()
+        return ext if ext in FORMATS else 'ndjson'
+
+    def export(self, users, fp, fmt, chunk_size):
+        """ Todas las recetas de los usuarios en un solo archivo """
+        count = 0
+
+        def rows():
+            nonlocal count
+            for user in users.iterator():
+                for row in export_rows(user, chunk_size):
+                    count += 1
+                    yield row
+
+        write_rows(rows(), fp, fmt)
+        return count
+
+    def export_per_user(self, users, directory, fmt, options):
+        """ Un archivo por usuario, repartidos entre procesos si --workers > 1 """
+        jobs = [
+            (pk, os.path.join(directory, f'{pk}.{fmt}'), fmt, options['chunk_size'])
+            for pk in users.values_list('id', flat=True).iterator()
+        ]
+        if options['workers'] > 1:
+            # Los procesos hijos no deben compartir las conexiones abiertas del padre
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(options['workers'], mp_context=context) as pool:
+                counts = list(pool.map(export_user_file, *zip(*jobs))) if jobs else []
+        else:
+            counts = [export_user_file(*job) for job in jobs]
+        self.stderr.write(f'Exported {sum(counts)} recipes of {len(jobs)} users to {directory}')
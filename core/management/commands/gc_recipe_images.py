@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core.images import rendition_name
+from core.models import Recipe
+from core.storage import recipe_image_storage
+from core.thumbnails import delete_thumbnails
+
+IMAGE_DIR = 'uploads/recipe'
+RENDITIONS_DIR = 'uploads/recipe/renditions'
+
+
+def reference_counts(names):
+    """ Cuantas recetas usan cada imagen """
+    counts = dict.fromkeys(names, 0)
+    rows = Recipe.objects.filter(image__in=names).values('image').annotate(count=Count('id'))
+    for row in rows:
+        counts[row['image']] = row['count']
+    return counts
+
+
+class Command(BaseCommand):
+    """ Borra las imagenes de recetas que ninguna receta usa """
+    help = 'Delete recipe images, their renditions and cached thumbnails no longer referenced by any recipe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Files checked per database query.')
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='Seconds a file must be untouched before it can be deleted.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report what would be deleted.')
+
+    def handle(self, *args, **options):
+        storage = recipe_image_storage
+        if not storage.exists(IMAGE_DIR):
+            self.stdout.write('Deleted 0 images')
+            return
+
+        # Archivos subidos hace poco pueden pertenecer a una receta aun sin confirmar
+        cutoff = time.time() - options['min_age']
+        files = sorted(storage.listdir(IMAGE_DIR)[1])
+        deleted, freed = 0, 0
+        for start in range(0, len(files), options['batch_size']):
+            names = [f'{IMAGE_DIR}/{filename}' for filename in files[start:start + options['batch_size']]]
+            for name, count in reference_counts(names).items():
+                if count or os.path.getmtime(storage.path(name)) > cutoff:
+                    continue
+                freed += storage.size(name)
+                deleted += 1
+                if not options['dry_run']:
+                    storage.delete(name)
+                    self.delete_renditions(name)
+                    # Un acierto del cache no consulta la base: sin esto la foto borrada se seguiria sirviendo
+                    delete_thumbnails(os.path.splitext(os.path.basename(name))[0])
+
+        self.stdout.write(
+            f"{'Would delete' if options['dry_run'] else 'Deleted'} {deleted} images ({freed} bytes)"
+        )
+
+    def delete_renditions(self, name):
+        """ Borra las rendiciones generadas a partir de una imagen """
+        storage = recipe_image_storage
+        directory = os.path.dirname(rendition_name(name, 'label', 'jpeg'))
+        if not storage.exists(directory):
+            return
+        for filename in storage.listdir(directory)[1]:
+            storage.delete(f'{directory}/{filename}')
+        os.rmdir(storage.path(directory))
@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.transfer import FORMATS, RowError, import_file, import_rows, read_rows
+
+
+class Command(BaseCommand):
+    """ Importa recetas exportadas con export_recipes, creando los tags e ingredientes por nombre """
+    help = (
+        'Import recipes from an NDJSON or CSV file. Each batch is committed on its own, '
+        'so the batches before an invalid row stay imported.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to read, or "-" for stdin.')
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Defaults to the file extension, or ndjson.')
+        parser.add_argument('--user', dest='email', metavar='EMAIL',
+                            help='Import every row for this user instead of the one in the row.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows inserted per transaction.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes importing in parallel; each one reads the file and '
+                                 'imports the users assigned to it.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        ext = os.path.splitext(path)[1].lstrip('.').lower()
+        fmt = options['format'] or (ext if ext in FORMATS else 'ndjson')
+        user = None
+        if options['email']:
+            try:
+                user = get_user_model().objects.get(email=options['email'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Unknown user: {options["email"]}')
+
+        try:
+            if path == '-':
+                if options['workers'] > 1:
+                    raise CommandError('--workers cannot read from stdin.')
+                count = import_rows(read_rows(sys.stdin, fmt), options['batch_size'], user=user)
+            elif options['workers'] > 1 and user is None:
+                count = self.import_parallel(path, fmt, options)
+            else:
+                count = import_file(path, fmt, options['batch_size'], user_id=user.pk if user else None)
+        except RowError as exc:
+            raise CommandError(str(exc))
+        except FileNotFoundError:
+            raise CommandError(f'File not found: {path}')
+        self.stdout.write(f'Imported {count} recipes')
+
+    def import_parallel(self, path, fmt, options):
+        """ Cada proceso lee el archivo completo e importa solo los usuarios de su particion """
+        workers = options['workers']
+        # Los procesos hijos no deben compartir las conexiones abiertas del padre
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(import_file, path, fmt, options['batch_size'], partition=(index, workers))
+                for index in range(workers)
+            ]
+            return sum(future.result() for future in futures)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core.images import process_image_job
+from core.models import ImageJob
+
+
+class Command(BaseCommand):
+    """ Procesa los trabajos de imagenes pendientes """
+    help = 'Generate renditions for pending recipe image jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Maximum number of jobs to process.')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Queue failed and interrupted jobs again before processing.')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            ImageJob.objects.filter(
+                status__in=(ImageJob.FAILED, ImageJob.PROCESSING)
+            ).update(status=ImageJob.PENDING, error='')
+
+        job_ids = ImageJob.objects.filter(status=ImageJob.PENDING).order_by('id').values_list('id', flat=True)
+        if options['limit'] is not None:
+            job_ids = job_ids[:options['limit']]
+
+        processed = 0
+        for job_id in list(job_ids):
+            process_image_job(job_id)
+            processed += 1
+        self.stdout.write(f'Processed {processed} image jobs')
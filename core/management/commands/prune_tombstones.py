@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tombstone
+from recipe.changes import sync_options
+
+
+class Command(BaseCommand):
+    """ Borra las lapidas mas antiguas que el periodo de retencion """
+    help = 'Delete tombstones older than RECIPE_SYNC["TOMBSTONE_RETENTION_DAYS"].'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=sync_options()['TOMBSTONE_RETENTION_DAYS'])
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(f'Deleted {deleted} tombstones')
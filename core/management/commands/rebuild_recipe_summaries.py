@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Recipe
+from core.summaries import SUMMARY_BATCH_SIZE, refresh_recipe_summaries
+
+
+class Command(BaseCommand):
+    """ Recalcula los ids desnormalizados de tags e ingredientes de las recetas """
+    help = 'Recompute the denormalized tag and ingredient ids of every recipe.'
+
+    def handle(self, *args, **options):
+        ids = Recipe.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=SUMMARY_BATCH_SIZE)
+        batch, refreshed = [], 0
+        for pk in ids:
+            batch.append(pk)
+            if len(batch) == SUMMARY_BATCH_SIZE:
+                with transaction.atomic():
+                    refresh_recipe_summaries(batch, touch=False)
+                refreshed += len(batch)
+                batch = []
+        if batch:
+            with transaction.atomic():
+                refresh_recipe_summaries(batch, touch=False)
+            refreshed += len(batch)
+        self.stdout.write(f'Refreshed {refreshed} recipes')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Recipe
+from core.search import INDEX_BATCH_SIZE, index_recipes
+
+
+class Command(BaseCommand):
+    """ Reconstruye el indice de busqueda de recetas """
+    help = 'Reindex the title and ingredients of every recipe for full-text search.'
+
+    def handle(self, *args, **options):
+        ids = Recipe.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=INDEX_BATCH_SIZE)
+        batch, indexed = [], 0
+        for pk in ids:
+            batch.append(pk)
+            if len(batch) == INDEX_BATCH_SIZE:
+                with transaction.atomic():
+                    index_recipes(batch)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            with transaction.atomic():
+                index_recipes(batch)
+            indexed += len(batch)
+        self.stdout.write(f'Indexed {indexed} recipes')
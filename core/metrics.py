@@ -0,0 +1,84 @@
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """ Tiempos acumulados de una peticion; se usa como execute_wrapper de la conexion """
+    def __init__(self):
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.queries = []
+        self.timings = {}
+        self._active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.query_count += 1
+            self.sql_time += duration
+            self.queries.append((duration, sql))
+
+    def add(self, name, duration):
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+
+def current_metrics():
+    """ Metricas de la peticion en curso, o None si no fue muestreada """
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    """ Activa las metricas para el bloque y las retorna """
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def track_queries():
+    """ Cuenta en las metricas activas las consultas del hilo actual """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        yield
+
+
+@contextmanager
+def timed(name):
+    """ Suma la duracion del bloque; las llamadas anidadas con el mismo nombre no se cuentan dos veces """
+    metrics = _current.get()
+    if metrics is None or name in metrics._active:
+        yield
+        return
+
+    metrics._active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start)
+        metrics._active.discard(name)
+
+
+class TimedSerializerMixin:
+    """ Mide el tiempo de serializacion dentro de las metricas de la peticion """
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from core import metrics as request_metrics
+from core.compression import compression_options, negotiate_codec
+
+logger = logging.getLogger('core.metrics')
+
+
+def _options():
+    return getattr(settings, 'REQUEST_METRICS', {})
+
+
+class RequestMetricsMiddleware:
+    """ Registra consultas, tiempo SQL, de serializacion y de renderizado por peticion """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Bajo ASGI no ocupar un hilo durante toda la peticion
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        options = _options()
+        if random.random() >= options.get('SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with request_metrics.collect() as metrics, request_metrics.track_queries():
+            response = self.get_response(request)
+        return self.finish(request, response, metrics, start, options)
+
+    async def __acall__(self, request):
+        """ Version asincrona; las vistas en hilos registran sus consultas con track_queries """
+        options = _options()
+        if random.random() >= options.get('SAMPLE_RATE', 1.0):
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        with request_metrics.collect() as metrics:
+            response = await self.get_response(request)
+        return self.finish(request, response, metrics, start, options)
+
+    def finish(self, request, response, metrics, start, options):
+        """ Agrega Server-Timing y registra la peticion """
+        total = time.perf_counter() - start
+        timings = {
+            'db': metrics.sql_time,
+            'serialize': metrics.timings.get('serialize', 0.0),
+            'render': metrics.timings.get('render', 0.0),
+            'total': total,
+        }
+        if options.get('SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={duration * 1000:.2f}' + (f';desc="{metrics.query_count} queries"' if name == 'db' else '')
+                for name, duration in timings.items()
+            )
+        self.log(request, response, metrics, timings, options)
+        return response
+
+    def process_template_response(self, request, response):
+        """ Medir el renderizado diferido de las respuestas de DRF """
+        metrics = request_metrics.current_metrics()
+        if metrics is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: metrics.add('render', time.perf_counter() - start)
+            )
+        return response
+
+    def log(self, request, response, metrics, timings, options):
+        """ Linea estructurada por peticion y listado de consultas si fue lenta """
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': metrics.query_count,
+        }
+        record.update({f'{name}_ms': round(duration * 1000, 2) for name, duration in timings.items()})
+        logger.info(json.dumps(record))
+
+        threshold = options.get('SLOW_REQUEST_MS')
+        if threshold is not None and timings['total'] * 1000 >= threshold:
+            slowest = sorted(metrics.queries, key=lambda query: query[0], reverse=True)
+            record['slow_queries'] = [
+                {'ms': round(duration * 1000, 2), 'sql': sql}
+                for duration, sql in slowest[:options.get('SLOW_QUERY_LIMIT', 10)]
+            ]
+            logger.warning(json.dumps(record))
+
+
+class CompressionMiddleware:
+    """ Comprime con zstd, brotli o gzip las respuestas de la API desde MIN_SIZE bytes """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        codec = self.get_codec(request, response)
+        return self.compress(response, codec) if codec else response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        codec = self.get_codec(request, response)
+        if codec is None:
+            return response
+        # Comprimir en el pool de hilos para no bloquear el event loop
+        return await sync_to_async(self.compress, thread_sensitive=False)(response, codec)
+
+    def get_codec(self, request, response):
+        """ Algoritmo a usar, o None si la respuesta es chica, no comprimible o el cliente no lo acepta """
+        options = compression_options()
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if response.has_header('Content-Encoding') or content_type not in options['CONTENT_TYPES']:
+            return None
+        if not response.streaming and len(response.content) < options['MIN_SIZE']:
+            return None
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return negotiate_codec(request.META.get('HTTP_ACCEPT_ENCODING'), options)
+
+    def compress(self, response, codec):
+        if response.streaming:
+            response.streaming_content = codec.stream(response.streaming_content)
+            del response['Content-Length']
+        else:
+            content = codec.compress(response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        # Los bytes cambian con la codificacion, la ETag ya no es fuerte
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codec.name
+        return response
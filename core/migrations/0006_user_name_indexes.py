@@ -0,0 +1,58 @@
+# Generated by Django 3.2.8 on 2026-10-18 06:13
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    db = schema_editor.connection.alias
+    for model_name, field_name, column in (('Tag', 'tags', 'tag_id'), ('Ingredient', 'ingredients', 'ingredient_id')):
+        model = apps.get_model('core', model_name)
+        through = Recipe._meta.get_field(field_name).remote_field.through
+        duplicates = (
+            model.objects.using(db).order_by().values('user_id', 'name')
+            .annotate(survivor=Min('id'), total=Count('id')).filter(total__gt=1)
+        )
+        for group in duplicates:
+            survivor = group['survivor']
+            extra = list(
+                model.objects.using(db).filter(user_id=group['user_id'], name=group['name'])
+                .exclude(id=survivor).values_list('id', flat=True)
+            )
+            linked = set(through.objects.using(db).filter(**{column: survivor}).values_list('recipe_id', flat=True))
+            for row in through.objects.using(db).filter(**{f'{column}__in': extra}):
+                if row.recipe_id in linked:
+                    row.delete()
+                else:
+                    setattr(row, column, survivor)
+                    row.save()
+                    linked.add(row.recipe_id)
+            model.objects.using(db).filter(id__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'title'], name='recipe_user_title_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_ingredient_name_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_name_per_user'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE core_recipe_search USING fts5("
+    "title, ingredients, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO core_recipe_search (rowid, title, ingredients) "
+    "SELECT r.id, r.title, COALESCE(("
+    "  SELECT group_concat(i.name, ' ') FROM core_recipe_ingredients ri"
+    "  JOIN core_ingredient i ON i.id = ri.ingredient_id WHERE ri.recipe_id = r.id"
+    "), '') FROM core_recipe r",
+)
+
+POSTGRESQL_CREATE = (
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE TABLE core_recipe_search ("
+    "  recipe_id bigint PRIMARY KEY REFERENCES core_recipe (id) ON DELETE CASCADE"
+    "  DEFERRABLE INITIALLY DEFERRED,"
+    "  document tsvector NOT NULL)",
+    "CREATE INDEX core_recipe_search_document_idx ON core_recipe_search USING GIN (document)",
+    "INSERT INTO core_recipe_search (recipe_id, document) "
+    "SELECT r.id, setweight(to_tsvector('spanish', unaccent(r.title)), 'A') || "
+    "setweight(to_tsvector('spanish', unaccent(COALESCE(("
+    "  SELECT string_agg(i.name, ' ') FROM core_recipe_ingredients ri"
+    "  JOIN core_ingredient i ON i.id = ri.ingredient_id WHERE ri.recipe_id = r.id"
+    "), ''))), 'B') FROM core_recipe r",
+)
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'sqlite': SQLITE_CREATE,
+        'postgresql': POSTGRESQL_CREATE,
+    }.get(schema_editor.connection.vendor, ())
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS core_recipe_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_image_jobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.8 on 2026-10-18 06:50
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def fill_recipe_summaries(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    db = schema_editor.connection.alias
+    ids = list(Recipe.objects.using(db).order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        related = {'ingredient_ids': defaultdict(list), 'tag_ids': defaultdict(list)}
+        for name, column, field in (('ingredients', 'ingredient_id', 'ingredient_ids'), ('tags', 'tag_id', 'tag_ids')):
+            rows = (
+                Recipe._meta.get_field(name).remote_field.through.objects.using(db)
+                .filter(recipe_id__in=batch).order_by(column).values_list('recipe_id', column)
+            )
+            for recipe_id, pk in rows:
+                related[field][recipe_id].append(pk)
+        recipes = [
+            Recipe(
+                id=pk, ingredient_ids=related['ingredient_ids'][pk], tag_ids=related['tag_ids'][pk],
+                ingredient_count=len(related['ingredient_ids'][pk])
+            )
+            for pk in batch
+        ]
+        Recipe.objects.using(db).bulk_update(recipes, ['ingredient_ids', 'tag_ids', 'ingredient_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image_content_addressed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_ids',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.RunPython(fill_recipe_summaries, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,21 @@
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.conf import settings
 from django.db.models.deletion import CASCADE
-import uuid
 import os
+import threading
+import time
+from contextlib import contextmanager
+
+from core.storage import recipe_image_storage
+
+# Mayor id que cabe en las claves BigAutoField; fuera de rango las consultas fallan
+MAX_ID = models.BigIntegerField.MAX_BIGINT
 
 def recipe_image_file_path(instance, filename):
-    """ Genera path para imagenes """
-    ext = filename.split('.')[-1]
-    filename = f'{uuid.uuid4()}.{ext}'
+    """ Genera path para imagenes; el almacenamiento lo nombra con el hash del contenido """
+    ext = filename.split('.')[-1].lower()
+    filename = f'image.{ext}'
 
     return os.path.join('uploads/recipe/', filename)
 
@@ -41,41 +48,205 @@ class User(AbstractBaseUser, PermissionsMixin):
     objects = UserManager()
     USERNAME_FIELD = 'email'
 
-class Tag(models.Model):
+class ChangeTrackedModel(models.Model):
+    """ Objeto de un usuario que /changes/ entrega en el orden en que se confirmaron sus escrituras """
+    # Version de datos del dueño tomada en la transaccion que escribio la fila, ver DataVersion
+    change_seq = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        if kwargs.get('update_fields'):
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+        # Sin savepoint, como save_base: un error deja la transaccion de quien llama para rollback
+        with transaction.atomic(using=using, savepoint=False):
+            self.change_seq = DataVersion.objects.db_manager(using).bump(self.user_id)
+            super().save(*args, **kwargs)
+
+class Tag(ChangeTrackedModel):
     """ Modelo de Tag para la receta """
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_tag_name_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'change_seq'], name='tag_user_change_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
-class Ingredient(models.Model):
+class Ingredient(ChangeTrackedModel):
     """ Modelo de ingrediente para la receta """
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_ingredient_name_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'change_seq'], name='ingredient_user_change_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
-class Recipe(models.Model):
+class Recipe(ChangeTrackedModel):
     """ Modelo de Receta """
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
     title = models.CharField(max_length=255)
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(null=True, upload_to=recipe_image_file_path, storage=recipe_image_storage, db_index=True)
+    image_renditions = models.JSONField(default=dict, blank=True)
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
+    # Copia de las relaciones para listar sin leer las tablas intermedias, ver core.summaries
+    ingredient_ids = models.JSONField(default=list, editable=False)
+    tag_ids = models.JSONField(default=list, editable=False)
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+            models.Index(fields=['user', 'title'], name='recipe_user_title_idx'),
+            models.Index(fields=['user', 'change_seq'], name='recipe_user_change_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+class ImageJob(models.Model):
+    """ Trabajo pendiente de procesamiento de la imagen de una receta """
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE)
+    source = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.source} ({self.status})'
+
+class Tombstone(ChangeTrackedModel):
+    """ Registro de un tag, ingrediente o receta eliminado, para la sincronizacion incremental """
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    RECIPE = 'recipe'
+    MODEL_CHOICES = (
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+        (RECIPE, 'Recipe'),
+    )
+
+    # Sin restriccion en la base: el borrado en cascada de un usuario crea lapidas antes de borrarlo
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='+'
+    )
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+            models.Index(fields=['user', 'change_seq'], name='tombstone_user_change_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
+
+class DataVersionManager(models.Manager):
+    # Versiones tomadas por los bloques shared() activos del hilo: {(alias, user_id): version}
+    _shared = threading.local()
+
+    def bump(self, user_id):
+        """ Version del usuario para las escrituras de la transaccion en curso; dentro de shared() no incrementa """
+        version = getattr(self._shared, 'versions', {}).get((self.db, user_id))
+        if version is not None:
+            return version
+        return self.reserve(user_id, 1)
+
+    def reserve(self, user_id, count):
+        """ Incrementa la version del usuario en count dentro de la transaccion en curso y retorna la ultima """
+        # Los valores desde version - count + 1 quedan reservados para quien llama
+        versions = self.filter(user_id=user_id)
+        with transaction.atomic(using=self.db, savepoint=False):
+            # La fila queda bloqueada hasta el commit, asi que las versiones se confirman en orden
+            if not versions.update(version=models.F('version') + count):
+                try:
+                    with transaction.atomic(using=self.db):
+                        # Un contador recreado nunca vuelve a un valor anterior
+                        self.create(user_id=user_id, version=time.time_ns() + count - 1)
+                except IntegrityError:
+                    versions.update(version=models.F('version') + count)
+            return versions.values_list('version', flat=True).get()
+
+    @contextmanager
+    def shared(self, user_id):
+        """ Transaccion en que todas las escrituras del usuario usan una version, tomada al entrar """
+        versions = self._shared.__dict__.setdefault('versions', {})
+        key = (self.db, user_id)
+        with transaction.atomic(using=self.db):
+            if key in versions:
+                yield versions[key]
+                return
+            # Tomada fuera de cualquier savepoint interno: un rollback parcial no la deshace
+            versions[key] = self.reserve(user_id, 1)
+            try:
+                yield versions[key]
+            finally:
+                del versions[key]
+
+class DataVersion(models.Model):
+    """ Version de los datos de recetas de un usuario, compartida por todos los procesos """
+    # Sin restriccion en la base: el borrado en cascada de un usuario cambia sus datos antes de borrarlo
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_constraint=False,
+        related_name='+'
+    )
+    version = models.BigIntegerField()
+
+    objects = DataVersionManager()
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f'{self.user_id}: {self.version}'
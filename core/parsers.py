@@ -0,0 +1,50 @@
+import codecs
+import io
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from core.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+
+# orjson lee los enteros desde 2 ** 64 como float; todos tienen al menos 20 digitos.
+# Marcar los digitos con translate y buscar la racha es varias veces mas rapido que un regex
+DIGIT_MARKS = bytes(0x31 if 0x30 <= byte <= 0x39 else 0x30 for byte in range(256))
+LONG_NUMBER = b'1' * 20
+
+
+class ORJSONParser(JSONParser):
+    """ JSONParser que decodifica con orjson los cuerpos UTF-8; los demas usan el de DRF """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        # orjson solo lee UTF-8 y siempre rechaza NaN e Infinity
+        if orjson is None or not self.strict or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        content = stream.read()
+        if LONG_NUMBER in content.translate(DIGIT_MARKS):
+            # El json de la libreria estandar conserva los enteros grandes como int
+            return super().parse(io.BytesIO(content), media_type, parser_context)
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackParser(BaseParser):
+    """ Lee cuerpos MessagePack; requiere el paquete msgpack """
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as exc:
+            # Los errores de msgpack (datos incompletos, sobrantes o invalidos) heredan de ValueError
+            raise ParseError('MessagePack parse error - %s' % str(exc))
+
+
+OPTIONAL_PARSERS = (MessagePackParser, ) if msgpack is not None else ()
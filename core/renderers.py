@@ -0,0 +1,59 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Tipos que orjson no conoce (Decimal, fechas con zona, textos traducibles...) se codifican como en DRF
+_default = encoders.JSONEncoder().default
+
+
+def json_dumps(data):
+    """ JSON compacto en UTF-8 con orjson si esta instalado, igual al de JSONRenderer """
+    if orjson is None:
+        return JSONRenderer().render(data)
+    try:
+        content = orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    except orjson.JSONEncodeError:
+        # Enteros de mas de 64 bits y otros casos que orjson rechaza
+        return JSONRenderer().render(data)
+    # JSONRenderer escapa estos separadores para que la salida sea JavaScript valido
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+class ORJSONRenderer(JSONRenderer):
+    """ JSONRenderer que codifica con orjson; con indentacion o sin orjson usa el de DRF """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        return json_dumps(data)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """ Renderiza en MessagePack; requiere el paquete msgpack """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+# Renderers que se agregan a las vistas de recetas solo si su dependencia esta instalada
+OPTIONAL_RENDERERS = (MessagePackRenderer, ) if msgpack is not None else ()
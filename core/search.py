@@ -0,0 +1,146 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+from core.models import Recipe
+
+SEARCH_TABLE = 'core_recipe_search'
+
+# Cantidad de ids por sentencia al reindexar, por debajo del limite de variables de SQLite
+INDEX_BATCH_SIZE = 500
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    """ Palabras de la busqueda, sin operadores ni comillas del usuario """
+    return _TOKEN_RE.findall(query or '')
+
+
+class SQLiteSearchBackend:
+    """ Indice FTS5 con tokenizador unicode61 que ignora acentos """
+
+    def index(self, cursor, ids):
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', ids)
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, ingredients) '
+            'SELECT r.id, r.title, COALESCE(('
+            "  SELECT group_concat(i.name, ' ') FROM core_recipe_ingredients ri"
+            '  JOIN core_ingredient i ON i.id = ri.ingredient_id WHERE ri.recipe_id = r.id'
+            f"), '') FROM core_recipe r WHERE r.id IN ({placeholders})",
+            ids
+        )
+
+    def remove(self, cursor, ids):
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', ids)
+
+    def search(self, cursor, user_id, terms, limit, within=('', ())):
+        # Cada palabra entre comillas; la ultima como prefijo para buscar mientras se escribe
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        cursor.execute(
+            f'SELECT {SEARCH_TABLE}.rowid FROM {SEARCH_TABLE} '
+            f'JOIN core_recipe r ON r.id = {SEARCH_TABLE}.rowid '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND r.user_id = %s{within[0]} '
+            f'ORDER BY bm25({SEARCH_TABLE}, 10.0, 1.0) LIMIT %s',
+            [match, user_id, *within[1], limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgreSQLSearchBackend:
+    """ Columna tsvector con indice GIN, diccionario spanish y unaccent """
+
+    def index(self, cursor, ids):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE recipe_id = ANY(%s)', [ids])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (recipe_id, document) '
+            "SELECT r.id, setweight(to_tsvector('spanish', unaccent(r.title)), 'A') || "
+            "setweight(to_tsvector('spanish', unaccent(COALESCE(("
+            "  SELECT string_agg(i.name, ' ') FROM core_recipe_ingredients ri"
+            '  JOIN core_ingredient i ON i.id = ri.ingredient_id WHERE ri.recipe_id = r.id'
+            "), ''))), 'B') FROM core_recipe r WHERE r.id = ANY(%s)",
+            [ids]
+        )
+
+    def remove(self, cursor, ids):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE recipe_id = ANY(%s)', [ids])
+
+    def search(self, cursor, user_id, terms, limit, within=('', ())):
+        query = ' & '.join(terms) + ':*'
+        cursor.execute(
+            f'SELECT s.recipe_id FROM {SEARCH_TABLE} s '
+            'JOIN core_recipe r ON r.id = s.recipe_id, '
+            "to_tsquery('spanish', unaccent(%s)) query "
+            f'WHERE s.document @@ query AND r.user_id = %s{within[0]} '
+            'ORDER BY ts_rank(s.document, query) DESC, s.recipe_id LIMIT %s',
+            [query, user_id, *within[1], limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend(),
+    'postgresql': PostgreSQLSearchBackend(),
+}
+
+
+def get_backend(using):
+    """ Backend de busqueda de la conexion, o None si no tiene indice """
+    return BACKENDS.get(connections[using].vendor)
+
+
+def _batches(ids):
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), INDEX_BATCH_SIZE):
+        yield ids[start:start + INDEX_BATCH_SIZE]
+
+
+def index_recipes(ids, using='default'):
+    """ Reindexa titulo e ingredientes de las recetas """
+    backend = get_backend(using)
+    if backend is None:
+        return
+    with connections[using].cursor() as cursor:
+        for batch in _batches(ids):
+            backend.index(cursor, batch)
+
+
+def remove_recipes(ids, using='default'):
+    """ Quita recetas eliminadas del indice """
+    backend = get_backend(using)
+    if backend is None:
+        return
+    with connections[using].cursor() as cursor:
+        for batch in _batches(ids):
+            backend.remove(cursor, batch)
+
+
+def search_recipe_ids(user_id, query, limit, using='default', queryset=None):
+    """ Ids de las recetas del usuario que coinciden, de mayor a menor relevancia; queryset limita a esas recetas """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    backend = get_backend(using)
+    if backend is None:
+        # Sin indice en este motor: recorrer titulos e ingredientes
+        condition = Q()
+        for term in terms:
+            condition &= Q(title__icontains=term) | Q(ingredients__name__icontains=term)
+        if queryset is not None:
+            condition &= Q(id__in=queryset.order_by().values('id'))
+        return list(
+            Recipe.objects.using(using).filter(condition, user_id=user_id)
+            .order_by('id').values_list('id', flat=True).distinct()[:limit]
+        )
+
+    within = ('', ())
+    if queryset is not None:
+        # Los filtros van dentro de la consulta ordenada: el limite se aplica despues de filtrar
+        sql, params = queryset.order_by().values('id').query.get_compiler(using).as_sql()
+        within = (f' AND r.id IN ({sql})', params)
+    with connections[using].cursor() as cursor:
+        return backend.search(cursor, user_id, terms, limit, within)
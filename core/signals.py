@@ -0,0 +1,150 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_token
+from core.backends import forget_unknown_user
+from core.db import close_unusable_connections, configure_sqlite
+from core.models import Ingredient, Recipe, Tag, Tombstone
+from core.search import index_recipes, remove_recipes
+from core.summaries import pending_recipe_changes, refresh_recipe_summaries
+from core.versioning import bump_data_version
+
+connection_created.connect(configure_sqlite)
+request_started.connect(close_unusable_connections)
+
+
+def _reindex(ids, using):
+    """ Reindexa las recetas, o las deja para el final del bloque recipe_changes activo """
+    changes = pending_recipe_changes(using)
+    if changes is None:
+        index_recipes(ids, using=using)
+    else:
+        changes.index.update(ids)
+
+
+def _refresh_summaries(ids, relation, using, instance=None):
+    """ Recalcula los resumenes, o los deja para el final del bloque recipe_changes activo """
+    changes = pending_recipe_changes(using)
+    if changes is None:
+        refresh_recipe_summaries(ids, (relation,), using=using, instances=[instance] if instance is not None else ())
+        return
+    changes.relations.add(relation)
+    for pk in ids:
+        if changes.instances.get(pk) is None:
+            changes.instances[pk] = instance if instance is not None and instance.pk == pk else None
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """ Quitar del cache los tokens eliminados """
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created, using, **kwargs):
+    """ Quitar del cache los tokens de un usuario modificado, desactivado o con nueva clave """
+    if created:
+        # Un id reutilizado no debe heredar ETags de un usuario anterior
+        bump_data_version(instance.pk, using=using)
+        return
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_unknown_email(sender, instance, **kwargs):
+    """ Un email registrado o cambiado deja de estar en el cache negativo de login """
+    forget_unknown_user(instance.get_username())
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def record_tombstone(sender, instance, using, **kwargs):
+    """ Registrar el borrado para que los clientes lo reciban en /changes/ """
+    Tombstone.objects.using(using).create(
+        user_id=instance.user_id, model=sender._meta.model_name, object_id=instance.pk
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, using, **kwargs):
+    """ Reindexar el titulo de una receta creada o modificada """
+    changes = pending_recipe_changes(using)
+    if changes is not None:
+        changes.saved.add(instance.pk)
+    _reindex([instance.pk], using)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_deleted_recipe(sender, instance, using, **kwargs):
+    """ Quitar del indice de busqueda una receta eliminada """
+    remove_recipes([instance.pk], using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_recipe_ingredients(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """ Reindexar las recetas cuyos ingredientes cambiaron """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _reindex([instance.pk], using)
+        return
+
+    # Desde el ingrediente: pk_set son recetas, y clear no las indica
+    if action == 'pre_clear':
+        instance._search_recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        _reindex(pk_set, using)
+    elif action == 'post_clear':
+        _reindex(instance.__dict__.pop('_search_recipe_ids', ()), using)
+
+
+@receiver(post_save, sender=Ingredient)
+def index_renamed_ingredient(sender, instance, created, using, **kwargs):
+    """ Reindexar las recetas de un ingrediente modificado """
+    if not created:
+        _reindex(instance.recipe_set.values_list('id', flat=True), using)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_related_recipes(sender, instance, **kwargs):
+    """ Recordar las recetas antes de que el borrado elimine la relacion """
+    instance._related_recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Ingredient)
+def index_deleted_ingredient(sender, instance, using, **kwargs):
+    """ Reindexar las recetas que tenian el ingrediente eliminado """
+    _reindex(getattr(instance, '_related_recipe_ids', ()), using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_recipe_relation_summaries(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """ Recalcular los ids desnormalizados de las recetas cuyos tags o ingredientes cambiaron """
+    relation = 'tags' if sender is Recipe.tags.through else 'ingredients'
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _refresh_summaries([instance.pk], relation, using, instance)
+        return
+
+    # Desde el tag o ingrediente: pk_set son recetas, y clear no las indica
+    if action == 'pre_clear':
+        instance._summary_recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        _refresh_summaries(pk_set, relation, using)
+    elif action == 'post_clear':
+        _refresh_summaries(instance.__dict__.pop('_summary_recipe_ids', ()), relation, using)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_deleted_related_summaries(sender, instance, using, **kwargs):
+    """ Quitar el tag o ingrediente eliminado de las recetas que lo tenian """
+    relation = 'tags' if sender is Tag else 'ingredients'
+    _refresh_summaries(getattr(instance, '_related_recipe_ids', ()), relation, using)
@@ -0,0 +1,110 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Recipe
+from core.search import index_recipes
+from core.versioning import bump_data_version, shared_data_version
+
+# Relacion de la receta a su columna desnormalizada de ids
+SUMMARY_FIELDS = {
+    'ingredients': 'ingredient_ids',
+    'tags': 'tag_ids',
+}
+
+# Recetas por sentencia al recalcular, por debajo del limite de variables de SQLite
+SUMMARY_BATCH_SIZE = 500
+
+# Bloques recipe_changes activos del hilo: {alias: RecipeChanges}
+_pending = threading.local()
+
+
+def recipe_summaries(ids, relations=tuple(SUMMARY_FIELDS), using='default'):
+    """ Ids ordenados de los tags e ingredientes de cada receta, leidos de las tablas intermedias """
+    summaries = {pk: {SUMMARY_FIELDS[name]: [] for name in relations} for pk in ids}
+    for name in relations:
+        through = getattr(Recipe, name).through
+        column = f'{Recipe._meta.get_field(name).related_model._meta.model_name}_id'
+        field = SUMMARY_FIELDS[name]
+        rows = (
+            through.objects.using(using).filter(recipe_id__in=ids)
+            .order_by(column).values_list('recipe_id', column)
+        )
+        for recipe_id, pk in rows:
+            summaries[recipe_id][field].append(pk)
+    for summary in summaries.values():
+        if 'ingredient_ids' in summary:
+            summary['ingredient_count'] = len(summary['ingredient_ids'])
+    return summaries
+
+
+def refresh_recipe_summaries(ids, relations=tuple(SUMMARY_FIELDS), using='default', instances=(), touch=True):
+    """ Recalcula las columnas desnormalizadas, tambien en instances; touch marca las recetas como modificadas """
+    instances = {instance.pk: instance for instance in instances}
+    ids = sorted(set(ids))
+    now = timezone.now()
+    for start in range(0, len(ids), SUMMARY_BATCH_SIZE):
+        with transaction.atomic(using=using, savepoint=False):
+            batch = recipe_summaries(ids[start:start + SUMMARY_BATCH_SIZE], relations, using)
+            if touch:
+                # Cada receta queda con la version de su dueño tomada en esta transaccion, ver /changes/
+                owners = dict(Recipe.objects.using(using).filter(id__in=list(batch)).values_list('id', 'user_id'))
+                seqs = {user_id: bump_data_version(user_id, using) for user_id in set(owners.values())}
+                batch = {pk: summary for pk, summary in batch.items() if pk in owners}
+                for pk, summary in batch.items():
+                    summary['updated_at'] = now
+                    summary['change_seq'] = seqs[owners[pk]]
+            if not batch:
+                continue
+            recipes = [Recipe(id=pk, **summary) for pk, summary in batch.items()]
+            fields = list(next(iter(batch.values())))
+            # bulk_update no envia post_save, el indice de busqueda no se toca
+            Recipe.objects.using(using).bulk_update(recipes, fields)
+        for pk, summary in batch.items():
+            if pk in instances:
+                for field, value in summary.items():
+                    setattr(instances[pk], field, value)
+
+
+class RecipeChanges:
+    """ Recetas escritas dentro de un bloque recipe_changes, recalculadas y reindexadas al salir """
+
+    def __init__(self):
+        # Receta con relaciones cambiadas -> instancia a actualizar, o None
+        self.instances = {}
+        self.relations = set()
+        # Guardadas en el bloque: ya tienen el numero de cambio y la fecha
+        self.saved = set()
+        self.index = set()
+
+    def apply(self, using):
+        ids = set(self.instances)
+        instances = [instance for instance in self.instances.values() if instance is not None]
+        relations = tuple(self.relations)
+        refresh_recipe_summaries(ids & self.saved, relations, using, instances, touch=False)
+        refresh_recipe_summaries(ids - self.saved, relations, using, instances)
+        if self.index:
+            index_recipes(self.index, using=using)
+
+
+def pending_recipe_changes(using='default'):
+    """ RecipeChanges del bloque recipe_changes activo en la conexion, o None """
+    return getattr(_pending, 'changes', {}).get(using)
+
+
+@contextmanager
+def recipe_changes(user_id, using='default'):
+    """ Transaccion con una version del usuario, un recalculo de resumenes y una reindexacion al final """
+    blocks = _pending.__dict__.setdefault('changes', {})
+    with shared_data_version(user_id, using):
+        if using in blocks:
+            yield blocks[using]
+            return
+        changes = blocks[using] = RecipeChanges()
+        try:
+            yield changes
+            changes.apply(using)
+        finally:
+            del blocks[using]
@@ -0,0 +1,97 @@
+import asyncio
+import gzip
+import json
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.models import Recipe, Tag
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+ME_URL = reverse('user:me')
+
+
+@override_settings(ROOT_URLCONF='app.asgi_urls')
+class AsyncReadViewsTest(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user('test@datadosis.com', 'Testpass', name='Test')
+        token = Token.objects.create(user=self.user)
+        self.client = AsyncClient()
+        # El AsyncClient de Django 3.2 recibe las cabeceras por su nombre HTTP en cada peticion
+        # y los parametros GET en la URL
+        self.auth = {'Authorization': f'Token {token.key}'}
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for i in range(3):
+            Recipe.objects.create(user=self.user, title=f'Recipe {i}', time_minutes=5, price=5).tags.add(tag)
+
+    async def test_read_endpoints(self):
+        """ Probar las lecturas a traves de las vistas asincronas """
+        recipes, tags, me = await asyncio.gather(
+            self.client.get(RECIPES_URL, **self.auth),
+            self.client.get(TAGS_URL, **self.auth),
+            self.client.get(ME_URL, **self.auth),
+        )
+
+        self.assertEqual(recipes.status_code, 200)
+        self.assertEqual(len(json.loads(recipes.content)['results']), 3)
+        self.assertEqual(json.loads(tags.content)['results'][0]['name'], 'Vegan')
+        self.assertEqual(json.loads(me.content)['email'], 'test@datadosis.com')
+        self.assertIn('db;dur=', recipes['Server-Timing'])
+
+    @override_settings(RESPONSE_COMPRESSION={'MIN_SIZE': 100})
+    async def test_compressed_response(self):
+        """ Probar que la compresion funciona en el camino asincrono del middleware """
+        res = await self.client.get(RECIPES_URL, **self.auth, **{'Accept-Encoding': 'gzip'})
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(res.content))['results']), 3)
+
+    async def test_detail_and_conditional_list(self):
+        """ Probar el detalle y la respuesta 304 del listado """
+        recipe_id = (await self.client.get(f'{RECIPES_URL}?fields=id', **self.auth)).json()['results'][0]['id']
+        detail = await self.client.get(reverse('recipe:recipe-detail', args=[recipe_id]), **self.auth)
+        self.assertEqual(detail.json()['tags'][0]['name'], 'Vegan')
+
+        listed = await self.client.get(TAGS_URL, **self.auth)
+        not_modified = await self.client.get(TAGS_URL, **self.auth, **{'If-None-Match': listed['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    async def test_stream_buffered(self):
+        """ Probar que el flujo NDJSON se genera fuera del event loop """
+        res = await self.client.get(f'{RECIPES_URL}?stream=1', **self.auth)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(res.content.splitlines()), 3)
+
+    async def test_reads_run_in_worker_threads(self):
+        """ Probar que las lecturas no ocupan el hilo del event loop """
+        loop_thread = threading.get_ident()
+        threads = []
+        original = RecipeViewSet.list
+
+        def record(view, request, *args, **kwargs):
+            threads.append(threading.get_ident())
+            return original(view, request, *args, **kwargs)
+
+        with patch.object(RecipeViewSet, 'list', record):
+            await self.client.get(RECIPES_URL, **self.auth)
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+    async def test_write_endpoint(self):
+        """ Probar que las escrituras siguen funcionando """
+        res = await self.client.post(
+            TAGS_URL, {'name': 'Dinner'}, content_type='application/json', **self.auth
+        )
+        self.assertEqual(res.status_code, 201)
@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+
+from core.backends import unknown_user_key
+
+
+class CachedEmailBackendTest(TestCase):
+
+    def setUp(self):
+        # Un cache en archivos lo comparten todos los procesos, como Redis o Memcached
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        shared = override_settings(
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.location},
+            },
+            AUTH_UNKNOWN_USER_CACHE_ALIAS='shared'
+        )
+        shared.enable()
+        self.addCleanup(shared.disable)
+
+    def test_unknown_email_cached(self):
+        """ Probar que un email inexistente se consulta solo una vez """
+        with self.assertNumQueries(1):
+            self.assertIsNone(authenticate(username='nobody@datadosis.com', password='Testpass'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(authenticate(username='nobody@datadosis.com', password='Testpass'))
+
+    def test_registered_email_forgotten(self):
+        """ Probar que un usuario nuevo puede autenticar aunque su email estuviera en cache """
+        authenticate(username='new@datadosis.com', password='Testpass')
+        user = get_user_model().objects.create_user(email='new@datadosis.com', password='Testpass')
+
+        self.assertEqual(authenticate(username='new@datadosis.com', password='Testpass'), user)
+
+    def test_registered_email_forgotten_in_other_process(self):
+        """ Probar que el registro borra la entrada que otro proceso guardo en el cache compartido """
+        other_process = FileBasedCache(self.location, {})
+        other_process.set(unknown_user_key('new@datadosis.com'), True)
+
+        user = get_user_model().objects.create_user(email='new@datadosis.com', password='Testpass')
+
+        self.assertIsNone(other_process.get(unknown_user_key('new@datadosis.com')))
+        self.assertEqual(authenticate(username='new@datadosis.com', password='Testpass'), user)
+
+    def test_not_cached_without_shared_cache(self):
+        """ Probar que sin cache compartido un usuario registrado en otro proceso puede autenticar """
+        with override_settings(AUTH_UNKNOWN_USER_CACHE_ALIAS=None):
+            with self.assertNumQueries(1):
+                self.assertIsNone(authenticate(username='new@datadosis.com', password='Testpass'))
+            # bulk_create no envia post_save: nada invalida entradas en este proceso
+            get_user_model().objects.bulk_create([
+                get_user_model()(email='new@datadosis.com', password=make_password('Testpass'))
+            ])
+
+            self.assertIsNotNone(authenticate(username='new@datadosis.com', password='Testpass'))
+
+    def test_local_cache_rejected(self):
+        """ Probar que un cache en memoria del proceso no se acepta como cache negativo """
+        with override_settings(AUTH_UNKNOWN_USER_CACHE_ALIAS='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                authenticate(username='nobody@datadosis.com', password='Testpass')
+
+    def test_wrong_password(self):
+        """ Probar que una clave incorrecta no autentica """
+        get_user_model().objects.create_user(email='test@datadosis.com', password='Testpass')
+        self.assertIsNone(authenticate(username='test@datadosis.com', password='wrong'))
+
+
+class TunedHasherTest(TestCase):
+
+    def test_iterations_from_settings(self):
+        """ Probar que las iteraciones se leen de PASSWORD_HASHER_OPTIONS """
+        with override_settings(PASSWORD_HASHER_OPTIONS={'PBKDF2_ITERATIONS': 1000}):
+            self.assertEqual(get_hasher().iterations, 1000)
+            self.assertTrue(get_hasher().encode('Testpass', 'salt').startswith('pbkdf2_sha256$1000$'))
+
+    def test_rehash_on_login(self):
+        """ Probar que la clave se vuelve a hashear al cambiar el costo """
+        with override_settings(PASSWORD_HASHER_OPTIONS={'PBKDF2_ITERATIONS': 1000}):
+            user = get_user_model().objects.create_user(email='test@datadosis.com', password='Testpass')
+        self.assertIn('$1000$', user.password)
+
+        with override_settings(PASSWORD_HASHER_OPTIONS={'PBKDF2_ITERATIONS': 2000}):
+            self.assertEqual(authenticate(username='test@datadosis.com', password='Testpass'), user)
+
+        user.refresh_from_db()
+        self.assertIn('$2000$', user.password)
+        self.assertTrue(user.check_password('Testpass'))
@@ -0,0 +1,99 @@
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from PIL import Image
+
+from core import images
+from core.models import ImageJob, Recipe
+
+
+def sample_jpeg(size=(64, 48)):
+    """ Retorna los bytes de una imagen JPEG con EXIF """
+    exif = Image.Exif()
+    exif[0x010f] = 'Test camera'
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(
+    RECIPE_IMAGE_RENDITIONS={'small': (16, 16)},
+    RECIPE_IMAGE_FORMATS=('webp', 'jpeg'),
+    RECIPE_IMAGE_WORKERS=0,
+)
+class ImageJobTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        user = get_user_model().objects.create_user('test@datadosis.com', 'Testpass')
+        self.recipe = Recipe.objects.create(user=user, title='Pizza', time_minutes=5, price=5.00)
+        self.recipe.image.save('photo.jpg', ContentFile(sample_jpeg()))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_process_job_generates_renditions(self):
+        """ Probar que el trabajo genera las rendiciones sin metadatos """
+        job = images.enqueue_image_job(self.recipe)
+        images.process_image_job(job.id)
+
+        job.refresh_from_db()
+        self.recipe.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+        self.assertEqual(set(self.recipe.image_renditions), {'small_webp', 'small_jpeg'})
+
+        with default_storage.open(self.recipe.image_renditions['small_jpeg']) as fp:
+            rendition = Image.open(fp)
+            self.assertEqual(rendition.size, (16, 12))
+            self.assertEqual(len(rendition.getexif()), 0)
+
+    def test_shared_image_renditions_reused(self):
+        """ Probar que otra receta con la misma imagen reutiliza las rendiciones publicadas """
+        images.process_image_job(images.enqueue_image_job(self.recipe).id)
+        self.recipe.refresh_from_db()
+        other = Recipe.objects.create(user=self.recipe.user, title='Pie', time_minutes=5, price=5.00)
+        other.image.save('copy.jpg', ContentFile(sample_jpeg()))
+
+        with patch('core.images.render_image') as render:
+            images.process_image_job(images.enqueue_image_job(other).id)
+
+        render.assert_not_called()
+        other.refresh_from_db()
+        self.assertEqual(other.image_renditions, self.recipe.image_renditions)
+
+    def test_replaced_image_not_published(self):
+        """ Probar que no se publican rendiciones de una imagen reemplazada """
+        job = images.enqueue_image_job(self.recipe)
+        self.recipe.image.save('other.jpg', ContentFile(sample_jpeg((32, 32))))
+        images.process_image_job(job.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_renditions, {})
+
+    def test_failed_job(self):
+        """ Probar que un archivo invalido marca el trabajo como fallido """
+        job = ImageJob.objects.create(recipe=self.recipe, source='uploads/recipe/missing.jpg')
+        with self.assertLogs('core.images', level='ERROR'):
+            images.process_image_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertTrue(job.error)
+
+    def test_job_submitted_on_commit(self):
+        """ Probar que el trabajo se envia al pool al confirmar la transaccion """
+        with override_settings(RECIPE_IMAGE_WORKERS=1):
+            with self.captureOnCommitCallbacks() as callbacks:
+                job = images.enqueue_image_job(self.recipe)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(job.status, ImageJob.PENDING)
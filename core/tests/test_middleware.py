@@ -0,0 +1,176 @@
+import gzip
+import json
+import logging
+from unittest import skipUnless
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.compression import compression_options, negotiate_codec
+from core.models import Recipe, Tag
+from core.renderers import msgpack
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(API_RESPONSE_CACHE={'MAX_BODY_SIZE': -1})
+class RequestMetricsMiddlewareTest(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@datadosis.com', 'Testpass')
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def server_timing(self, res):
+        """ Retorna las entradas del header Server-Timing por nombre """
+        entries = {}
+        for entry in res['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries[name] = dict(param.split('=', 1) for param in params)
+        return entries
+
+    def test_server_timing_header(self):
+        """ Probar que la respuesta incluye tiempos de db, serializacion y render """
+        res = self.client.get(TAGS_URL)
+
+        entries = self.server_timing(res)
+        self.assertEqual(set(entries), {'db', 'serialize', 'render', 'total'})
+        self.assertEqual(entries['db']['desc'], '"2 queries"')
+        self.assertGreater(float(entries['serialize']['dur']), 0)
+        self.assertGreater(float(entries['render']['dur']), 0)
+
+    def test_measured_request_logged(self):
+        """ Probar que cada peticion medida registra una linea INFO estructurada """
+        self.assertTrue(logging.getLogger('core.metrics').isEnabledFor(logging.INFO))
+        with self.assertLogs('core.metrics', level='INFO') as logs:
+            self.client.get(TAGS_URL)
+
+        self.assertEqual([record.levelno for record in logs.records], [logging.INFO])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'recipe:tag-list')
+        self.assertEqual(record['queries'], 2)
+
+    @override_settings(REQUEST_METRICS={'SAMPLE_RATE': 0})
+    def test_unsampled_request(self):
+        """ Probar que las peticiones no muestreadas no se miden """
+        res = self.client.get(TAGS_URL)
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(REQUEST_METRICS={'SLOW_REQUEST_MS': 0, 'SLOW_QUERY_LIMIT': 5})
+    def test_slow_request_logs_queries(self):
+        """ Probar que una peticion lenta registra sus consultas """
+        with self.assertLogs('core.metrics', level='WARNING') as logs:
+            self.client.get(TAGS_URL)
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'recipe:tag-list')
+        # La version de datos del usuario y la pagina de tags
+        self.assertEqual(record['queries'], 2)
+        self.assertTrue(any('core_tag' in query['sql'] for query in record['slow_queries']))
+
+
+@override_settings(RESPONSE_COMPRESSION={'MIN_SIZE': 200})
+class CompressionMiddlewareTest(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@datadosis.com', 'Testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_tags(self, count):
+        Tag.objects.bulk_create(Tag(user=self.user, name=f'Tag number {i}') for i in range(count))
+
+    def test_large_response_compressed(self):
+        """ Probar que un listado grande se comprime y su ETag pasa a debil """
+        self.create_tags(20)
+        plain = self.client.get(TAGS_URL)
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='br;q=0.5, gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(res['ETag'], 'W/' + plain['ETag'])
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+
+    def test_weak_etag_not_modified(self):
+        """ Probar que la ETag debil del cuerpo comprimido permite responder 304 """
+        self.create_tags(20)
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, 304)
+
+    def test_small_response_not_compressed(self):
+        """ Probar que las respuestas bajo MIN_SIZE no se comprimen """
+        self.create_tags(1)
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', res)
+
+    def test_client_without_compression(self):
+        """ Probar que sin Accept-Encoding se responde sin comprimir pero con Vary """
+        self.create_tags(20)
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', res)
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_html_not_compressed(self):
+        """ Probar que las paginas HTML de la API navegable no se comprimen """
+        self.create_tags(20)
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT='text/html', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/html'))
+        self.assertGreater(len(res.content), 200)
+        self.assertNotIn('Content-Encoding', res)
+
+    def test_stream_compressed(self):
+        """ Probar que el flujo NDJSON se comprime mientras se genera """
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title=f'Recipe {i}', time_minutes=5, price=1) for i in range(20)
+        )
+        res = self.client.get(RECIPES_URL, {'stream': 1}, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(res.streaming_content)).splitlines()
+        self.assertEqual(len(lines), 20)
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack_list(self):
+        """ Probar listar en MessagePack """
+        self.create_tags(2)
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(len(msgpack.unpackb(res.content)['results']), 2)
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack_request_body(self):
+        """ Probar crear una receta enviando el cuerpo en MessagePack """
+        body = msgpack.packb({'title': 'Soup', 'time_minutes': 5, 'price': '1.50', 'tags': ['Vegan'], 'ingredients': []})
+        res = self.client.post(
+            RECIPES_URL, body, content_type='application/msgpack', HTTP_ACCEPT='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, 201)
+        data = msgpack.unpackb(res.content)
+        self.assertEqual(data['title'], 'Soup')
+        self.assertEqual(Recipe.objects.get(pk=data['id']).tags.get().name, 'Vegan')
+
+
+class NegotiateCodecTest(SimpleTestCase):
+
+    def negotiate(self, header):
+        codec = negotiate_codec(header, compression_options())
+        return codec.name if codec else None
+
+    def test_negotiate(self):
+        """ Probar pesos q, comodin y codificaciones sin libreria instalada """
+        self.assertEqual(self.negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(self.negotiate('*'), self.negotiate('zstd, br, gzip'))
+        self.assertIsNone(self.negotiate('gzip;q=0, identity'))
+        self.assertIsNone(self.negotiate(''))
+        self.assertIsNone(self.negotiate('deflate'))
+        self.assertEqual(self.negotiate('gzip;q=1.0, *;q=0.1'), 'gzip')
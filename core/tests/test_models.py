@@ -1,6 +1,6 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
-from unittest.mock import patch
+from django.db import IntegrityError
 
 from core import models
 
@@ -61,6 +61,15 @@ class ModelTest(TestCase):
         )
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_tag_name_unique_per_user(self):
+        """ Probar que un usuario no puede repetir el nombre de un tag """
+        user = sample_user()
+        models.Tag.objects.create(user=user, name='Meat')
+        models.Tag.objects.create(user=sample_user('other@datadosis.com'), name='Meat')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Meat')
+
     def test_recipe_str(self):
         """ Probar representacion en cadena de texto de Receta """
         recipe = models.Recipe.objects.create(
@@ -71,12 +80,9 @@ class ModelTest(TestCase):
         )
         self.assertEqual(str(recipe), recipe.title)
 
-    @patch('uuid.uuid4')
-    def test_recipe_file_name_uuid(self, mock_uuid):
-        """ Probar que imagen ha sido guardado en lugar secreto """
-        uuid = 'test-uuid'
-        mock_uuid.return_value = uuid
-        file_path = models.recipe_image_file_path(None, 'myimage.jpg')
+    def test_recipe_file_name(self):
+        """ Probar que la ruta de la imagen conserva la extension en minusculas """
+        file_path = models.recipe_image_file_path(None, 'myimage.JPG')
 
-        exp_path = f'uploads/recipe/{uuid}.jpg'
+        exp_path = 'uploads/recipe/image.jpg'
         self.assertEqual(file_path, exp_path)
\ No newline at end of file
@@ -0,0 +1,93 @@
+import datetime
+import decimal
+import io
+import uuid
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import MessagePackParser, ORJSONParser
+from core.renderers import ORJSONRenderer, msgpack
+
+
+class ORJSONRendererTests(TestCase):
+    """ Probar que el renderer con orjson produce lo mismo que el de DRF """
+    def setUp(self):
+        self.data = {
+            'price': decimal.Decimal('5.50'),
+            'created_at': datetime.datetime(2021, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+            'day': datetime.date(2021, 5, 1),
+            'uuid': uuid.UUID(int=7),
+            'label': gettext_lazy('Tags'),
+            'tags': {3, 1},
+            'title': 'Ñandú\u2028',
+            1: None,
+        }
+
+    def test_same_output_as_drf(self):
+        """ Probar Decimal, fechas, UUID, textos traducibles y separadores de linea """
+        self.assertEqual(ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_indent_uses_drf(self):
+        """ Probar que pedir indentacion usa el renderer de DRF """
+        content = ORJSONRenderer().render({'id': 1}, 'application/json; indent=4')
+        self.assertEqual(content, b'{\n    "id": 1\n}')
+
+    def test_without_orjson(self):
+        """ Probar que sin orjson se usa el renderer de DRF """
+        with patch('core.renderers.orjson', None):
+            content = ORJSONRenderer().render(self.data)
+        self.assertEqual(content, JSONRenderer().render(self.data))
+
+    def test_large_integer(self):
+        """ Probar enteros que orjson no soporta """
+        self.assertEqual(ORJSONRenderer().render({'id': 2 ** 70}), b'{"id":%d}' % 2 ** 70)
+
+
+class ORJSONParserTests(TestCase):
+    """ Probar el parser con orjson """
+    def test_parse(self):
+        """ Probar leer un cuerpo UTF-8 """
+        data = ORJSONParser().parse(io.BytesIO('{"title": "Ñandú", "tags": [1, 2]}'.encode('utf-8')))
+        self.assertEqual(data, {'title': 'Ñandú', 'tags': [1, 2]})
+
+    def test_invalid(self):
+        """ Probar que JSON invalido y NaN retornan ParseError """
+        for body in (b'{"title": ', b'{"price": NaN}'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(body))
+
+    def test_large_integer(self):
+        """ Probar que los enteros de mas de 64 bits se leen como int, igual que con DRF """
+        body = b'{"tags": [99999999999999999999999, 18446744073709551615], "price": 1e23}'
+        data = ORJSONParser().parse(io.BytesIO(body))
+        self.assertEqual(data, {'tags': [99999999999999999999999, 18446744073709551615], 'price': 1e23})
+        self.assertIsInstance(data['tags'][0], int)
+
+    def test_other_encoding(self):
+        """ Probar que otras codificaciones usan el parser de DRF """
+        body = '{"title": "Ñandú"}'.encode('latin-1')
+        data = ORJSONParser().parse(io.BytesIO(body), parser_context={'encoding': 'latin-1'})
+        self.assertEqual(data, {'title': 'Ñandú'})
+
+
+@skipUnless(msgpack, 'msgpack is not installed')
+class MessagePackParserTests(TestCase):
+    """ Probar el parser de MessagePack """
+    def test_parse(self):
+        """ Probar leer un mapa con textos, listas y enteros grandes """
+        body = msgpack.packb({'title': 'Ñandú', 'tags': [1, 2 ** 63], 'link': None})
+        data = MessagePackParser().parse(io.BytesIO(body))
+        self.assertEqual(data, {'title': 'Ñandú', 'tags': [1, 2 ** 63], 'link': None})
+
+    def test_invalid(self):
+        """ Probar que datos incompletos o sobrantes retornan ParseError """
+        body = msgpack.packb({'title': 'Soup'})
+        for invalid in (body[:-2], body + b'\x01', b'\xc1'):
+            with self.assertRaises(ParseError):
+                MessagePackParser().parse(io.BytesIO(invalid))
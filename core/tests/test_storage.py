@@ -0,0 +1,99 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+
+from core import thumbnails
+from core.models import Recipe
+from core.storage import recipe_image_storage
+from core.tests.test_images import sample_jpeg
+
+
+class ContentAddressedStorageTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            RECIPE_THUMBNAILS={
+                'CACHE_DIR': os.path.join(self.media_root, 'thumbnails'),
+                'MAX_SIZE': 1024 * 1024,
+                'SIZES': ((16, 16),),
+            },
+        )
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user('test@datadosis.com', 'Testpass')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def recipe_with_image(self, content, filename='photo.JPG'):
+        recipe = Recipe.objects.create(user=self.user, title='Pizza', time_minutes=5, price=5.00)
+        recipe.image.save(filename, ContentFile(content))
+        return recipe
+
+    def test_image_named_by_content(self):
+        """ Probar que la imagen se guarda con el SHA-256 de su contenido """
+        content = sample_jpeg()
+        recipe = self.recipe_with_image(content)
+
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(recipe.image.name, f'uploads/recipe/{digest}.jpg')
+        self.assertTrue(os.path.exists(recipe.image.path))
+
+    def test_same_image_stored_once(self):
+        """ Probar que la misma imagen subida a dos recetas se guarda una vez """
+        content = sample_jpeg()
+        first = self.recipe_with_image(content)
+        second = self.recipe_with_image(content, 'copy.jpg')
+        other = self.recipe_with_image(sample_jpeg((32, 32)))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'uploads/recipe'))), 2)
+
+    def test_gc_deletes_orphans(self):
+        """ Probar que la limpieza borra solo las imagenes sin recetas """
+        content = sample_jpeg()
+        kept = self.recipe_with_image(content)
+        self.recipe_with_image(content)
+        replaced = self.recipe_with_image(sample_jpeg((32, 32)))
+        orphan = replaced.image.name
+        replaced.image.save('new.jpg', ContentFile(sample_jpeg((16, 16))))
+        renditions = os.path.join(self.media_root, 'uploads/recipe/renditions', os.path.basename(orphan)[:-4])
+        os.makedirs(renditions)
+        open(os.path.join(renditions, 'small.jpg'), 'wb').close()
+        cache = thumbnails.get_cache()
+        thumbnail = cache.path(f'{os.path.basename(orphan)[:-4]}/16x16.jpg')
+        cache.put(thumbnail, b'thumbnail')
+
+        out = StringIO()
+        call_command('gc_recipe_images', '--min-age=0', '--batch-size=1', stdout=out)
+
+        self.assertIn('Deleted 1 images', out.getvalue())
+        self.assertFalse(recipe_image_storage.exists(orphan))
+        self.assertFalse(os.path.exists(renditions))
+        self.assertFalse(os.path.exists(thumbnail))
+        self.assertTrue(recipe_image_storage.exists(kept.image.name))
+        self.assertTrue(recipe_image_storage.exists(replaced.image.name))
+
+    def test_gc_keeps_recent_files(self):
+        """ Probar que la limpieza respeta los archivos recientes y --dry-run """
+        recipe = self.recipe_with_image(sample_jpeg())
+        name = recipe.image.name
+        recipe.delete()
+
+        call_command('gc_recipe_images', stdout=StringIO())
+        self.assertTrue(recipe_image_storage.exists(name))
+
+        out = StringIO()
+        call_command('gc_recipe_images', '--min-age=0', '--dry-run', stdout=out)
+        self.assertIn('Would delete 1 images', out.getvalue())
+        self.assertTrue(recipe_image_storage.exists(name))
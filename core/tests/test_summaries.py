@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Ingredient, Recipe, Tag
+from core.search import search_recipe_ids
+from core.summaries import recipe_changes, refresh_recipe_summaries
+from core.versioning import bump_data_version, get_data_version
+
+
+class RecipeSummaryTests(TestCase):
+    """ Probar que los ids desnormalizados siguen a las relaciones de la receta """
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@test.com', 'testpass')
+        self.recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=5, price=1)
+        self.tags = [Tag.objects.create(user=self.user, name=f'Tag {i}') for i in range(3)]
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+    def assertSummary(self, recipe, tag_ids, ingredient_ids):
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tag_ids, tag_ids)
+        self.assertEqual(recipe.ingredient_ids, ingredient_ids)
+        self.assertEqual(recipe.ingredient_count, len(ingredient_ids))
+
+    def test_add_remove_clear(self):
+        """ Probar agregar, quitar y vaciar desde la receta """
+        a, b, c = self.tags
+        self.recipe.tags.add(c, a)
+        self.recipe.ingredients.add(self.salt)
+        # La instancia en memoria tambien queda al dia
+        self.assertEqual(self.recipe.tag_ids, [a.id, c.id])
+        self.assertSummary(self.recipe, [a.id, c.id], [self.salt.id])
+
+        self.recipe.tags.remove(a)
+        self.assertSummary(self.recipe, [c.id], [self.salt.id])
+
+        self.recipe.tags.set([b])
+        self.recipe.ingredients.clear()
+        self.assertSummary(self.recipe, [b.id], [])
+
+    def test_reverse_relation(self):
+        """ Probar cambios desde el tag hacia varias recetas """
+        other = Recipe.objects.create(user=self.user, title='Pie', time_minutes=5, price=1)
+        tag = self.tags[0]
+        tag.recipe_set.add(self.recipe, other)
+        self.assertSummary(other, [tag.id], [])
+
+        tag.recipe_set.remove(other)
+        self.assertSummary(other, [], [])
+
+        tag.recipe_set.clear()
+        self.assertSummary(self.recipe, [], [])
+
+    def test_delete_related(self):
+        """ Probar que borrar un tag o ingrediente lo quita de las recetas """
+        self.recipe.tags.add(*self.tags)
+        self.recipe.ingredients.add(self.salt)
+
+        self.tags[1].delete()
+        Ingredient.objects.filter(pk=self.salt.pk).delete()
+
+        self.assertSummary(self.recipe, [self.tags[0].id, self.tags[2].id], [])
+
+    def test_refresh_repairs_columns(self):
+        """ Probar que refresh_recipe_summaries recalcula desde las tablas intermedias """
+        self.recipe.tags.add(self.tags[0])
+        Recipe.objects.filter(pk=self.recipe.pk).update(tag_ids=[], ingredient_count=7)
+
+        refresh_recipe_summaries([self.recipe.pk])
+
+        self.assertSummary(self.recipe, [self.tags[0].id], [])
+
+    def test_recipe_changes_batched(self):
+        """ Probar que un bloque recipe_changes toma una version y recalcula e indexa una vez al salir """
+        with CaptureQueriesContext(connection) as ctx:
+            with recipe_changes(self.user.pk):
+                self.recipe.title = 'Sopa de tomate'
+                self.recipe.save()
+                self.recipe.tags.add(*self.tags)
+                self.recipe.ingredients.add(self.salt)
+                tag = Tag.objects.create(user=self.user, name='Nuevo')
+                self.recipe.tags.add(tag)
+                # Dentro del bloque aun no se recalcula
+                self.assertEqual(self.recipe.tag_ids, [])
+
+        statements = [query['sql'] for query in ctx.captured_queries]
+        self.assertEqual(len([sql for sql in statements if sql.startswith('UPDATE "core_dataversion"')]), 1)
+        # El recalculo es el unico bulk_update de recetas
+        self.assertEqual(len([sql for sql in statements if sql.startswith('UPDATE "core_recipe"') and 'CASE' in sql]), 1)
+        self.assertEqual(len([sql for sql in statements if sql.startswith('DELETE FROM core_recipe_search')]), 1)
+        tag_ids = sorted(t.id for t in [*self.tags, tag])
+        self.assertEqual(self.recipe.tag_ids, tag_ids)
+        self.assertSummary(self.recipe, tag_ids, [self.salt.id])
+        self.assertEqual(self.recipe.change_seq, tag.change_seq)
+        self.assertEqual(self.recipe.change_seq, get_data_version(self.user.pk))
+        self.assertEqual(list(search_recipe_ids(self.user.pk, 'salt', 10)), [self.recipe.pk])
+
+    def test_recipe_changes_rolled_back(self):
+        """ Probar que un bloque que falla no deja cambios pendientes ni una version compartida """
+        version = get_data_version(self.user.pk)
+        with self.assertRaises(ValueError):
+            with recipe_changes(self.user.pk):
+                self.recipe.tags.add(self.tags[0])
+                raise ValueError()
+
+        self.assertSummary(self.recipe, [], [])
+        self.assertEqual(get_data_version(self.user.pk), version)
+        self.assertEqual(bump_data_version(self.user.pk), version + 1)
+        self.recipe.tags.add(self.tags[0])
+        self.assertSummary(self.recipe, [self.tags[0].id], [])
@@ -0,0 +1,133 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from PIL import Image
+
+from core import thumbnails
+from core.models import Recipe
+from core.tests.test_images import sample_jpeg
+from core.thumbnails import ThumbnailCache
+
+SIZES = ((16, 16), (32, 32))
+
+
+def thumbnail_url(recipe, size, ext):
+    key = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    width, height = size
+    return reverse('recipe-thumbnail', kwargs={'key': key, 'width': width, 'height': height, 'ext': ext})
+
+
+class RecipeThumbnailTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.media_root, 'thumbnails')
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            RECIPE_THUMBNAILS={'CACHE_DIR': self.cache_dir, 'MAX_SIZE': 10 * 1024 * 1024, 'SIZES': SIZES},
+        )
+        self.settings_override.enable()
+        user = get_user_model().objects.create_user('test@datadosis.com', 'Testpass')
+        self.recipe = Recipe.objects.create(user=user, title='Pizza', time_minutes=5, price=5.00)
+        self.recipe.image.save('photo.jpg', ContentFile(sample_jpeg((64, 48))))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_thumbnail_generated_and_cached(self):
+        """ Probar que la miniatura se genera una vez y luego se sirve del disco """
+        url = thumbnail_url(self.recipe, (32, 32), 'webp')
+        with self.assertNumQueries(1):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'image/webp')
+        self.assertIn('immutable', res['Cache-Control'])
+        image = Image.open(io.BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual((image.format, image.size), ('WEBP', (32, 24)))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        res.close()
+
+    def test_unknown_key_or_size(self):
+        """ Probar que claves, formatos y tamaños no configurados retornan 404 """
+        missing = reverse('recipe-thumbnail', kwargs={'key': 'missing', 'width': 16, 'height': 16, 'ext': 'jpg'})
+        self.assertEqual(self.client.get(missing).status_code, 404)
+        self.assertEqual(self.client.get(thumbnail_url(self.recipe, (16, 17), 'jpg')).status_code, 404)
+        self.assertEqual(self.client.get(thumbnail_url(self.recipe, (8, 8), 'jpg')).status_code, 404)
+        self.assertEqual(self.client.get(thumbnail_url(self.recipe, (16, 16), 'gif')).status_code, 404)
+
+    def test_sendfile_header(self):
+        """ Probar que con SENDFILE_HEADER el servidor web envia el archivo """
+        options = {'CACHE_DIR': self.cache_dir, 'MAX_SIZE': 10 * 1024 * 1024, 'SIZES': SIZES,
+                   'SENDFILE_HEADER': 'X-Accel-Redirect', 'SENDFILE_PREFIX': '/protected/'}
+        with override_settings(RECIPE_THUMBNAILS=options):
+            res = self.client.get(thumbnail_url(self.recipe, (16, 16), 'jpg'))
+
+        self.assertEqual(res.content, b'')
+        self.assertTrue(res['X-Accel-Redirect'].startswith('/protected/'))
+        self.assertTrue(res['X-Accel-Redirect'].endswith('.jpg'))
+
+    def test_concurrent_requests_render_once(self):
+        """ Probar que peticiones simultaneas generan la miniatura una sola vez """
+        key = os.path.splitext(os.path.basename(self.recipe.image.name))[0]
+        source = self.recipe.image.name
+        barrier = threading.Barrier(4)
+        results = []
+
+        def request():
+            barrier.wait()
+            results.append(thumbnails.get_thumbnail(key, 20, 20, 'jpg', lambda key: source))
+
+        with patch('core.thumbnails.render_image', wraps=thumbnails.render_image) as render:
+            threads = [threading.Thread(target=request) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(len(set(results)), 1)
+
+
+class ThumbnailCacheTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_sharded_paths(self):
+        """ Probar que las entradas se reparten en dos niveles de directorios """
+        path = ThumbnailCache(self.directory, 100).path('key/10x10.jpg')
+        parts = os.path.relpath(path, self.directory).split(os.sep)
+        self.assertEqual([len(part) for part in parts[:2]], [2, 2])
+        self.assertTrue(parts[2].endswith('.jpg'))
+
+    def test_evicts_least_recently_used(self):
+        """ Probar que al superar el limite se borran las entradas menos usadas """
+        cache = ThumbnailCache(self.directory, max_size=250)
+        paths = [cache.path(f'key/{i}.jpg') for i in range(3)]
+        for i, path in enumerate(paths[:2]):
+            cache.put(path, b'x' * 100)
+            os.utime(path, (1000 + i, 1000 + i))
+        # La primera se usa despues de la segunda
+        self.assertEqual(cache.get(paths[0]), paths[0])
+
+        cache.put(paths[2], b'x' * 100)
+
+        self.assertTrue(os.path.exists(paths[0]))
+        self.assertFalse(os.path.exists(paths[1]))
+        self.assertTrue(os.path.exists(paths[2]))
@@ -0,0 +1,118 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import Ingredient, Recipe, Tag
+from core.search import search_recipe_ids
+from core.transfer import user_partition
+
+
+class RecipeTransferTests(TestCase):
+    """ Probar la exportacion e importacion de recetas por comandos """
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@test.com', 'testpass')
+        self.other = get_user_model().objects.create_user('other@test.com', 'testpass')
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        pepper = Ingredient.objects.create(user=self.user, name='Pimienta, negra')
+        soup = Recipe.objects.create(user=self.user, title='Tomato soup', time_minutes=5, price='1.50')
+        soup.tags.add(vegan)
+        soup.ingredients.add(salt, pepper)
+        Recipe.objects.create(user=self.user, title='Plain rice', time_minutes=20, price=2)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def export(self, fmt):
+        path = os.path.join(self.directory, f'recipes.{fmt}')
+        call_command('export_recipes', '--user=test@test.com', f'--output={path}',
+                     '--chunk-size=1', stderr=StringIO())
+        return path
+
+    def import_file(self, path, *args):
+        out = StringIO()
+        call_command('import_recipes', path, *args, stdout=out)
+        return out.getvalue()
+
+    def assertImported(self, user):
+        soup = Recipe.objects.get(user=user, title='Tomato soup')
+        self.assertEqual(str(soup.price), '1.50')
+        self.assertEqual([tag.name for tag in soup.tags.all()], ['Vegan'])
+        self.assertEqual(
+            sorted(ingredient.name for ingredient in soup.ingredients.all()),
+            ['Pimienta, negra', 'Salt']
+        )
+        self.assertEqual(soup.tag_ids, [tag.id for tag in soup.tags.all()])
+        self.assertEqual(soup.ingredient_ids, sorted(soup.ingredients.values_list('id', flat=True)))
+        self.assertEqual(soup.ingredient_count, 2)
+        self.assertEqual(list(search_recipe_ids(user.id, 'tomato', 10)), [soup.id])
+        self.assertEqual(Recipe.objects.get(user=user, title='Plain rice').tag_ids, [])
+
+    def test_round_trip_ndjson(self):
+        """ Probar exportar e importar NDJSON en otro usuario """
+        path = self.export('ndjson')
+        out = self.import_file(path, '--user=other@test.com', '--batch-size=1')
+
+        self.assertIn('Imported 2 recipes', out)
+        self.assertImported(self.other)
+
+    def test_round_trip_csv(self):
+        """ Probar exportar e importar CSV reutilizando los tags existentes """
+        Tag.objects.create(user=self.other, name='Vegan')
+        path = self.export('csv')
+        self.import_file(path, '--user=other@test.com')
+
+        self.assertImported(self.other)
+        self.assertEqual(Tag.objects.filter(user=self.other).count(), 1)
+
+    def test_export_per_user(self):
+        """ Probar que un directorio de salida recibe un archivo por usuario """
+        call_command('export_recipes', f'--output={self.directory}', stderr=StringIO())
+
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            sorted(f'{pk}.ndjson' for pk in (self.user.pk, self.other.pk))
+        )
+        with open(os.path.join(self.directory, f'{self.other.pk}.ndjson')) as fp:
+            self.assertEqual(fp.read(), '')
+
+    def test_invalid_row(self):
+        """ Probar que una fila invalida detiene la importacion con su linea """
+        path = os.path.join(self.directory, 'bad.ndjson')
+        with open(path, 'w') as fp:
+            fp.write('{"user": "other@test.com", "title": "Soup", "time_minutes": 5, "price": "x"}\n')
+
+        with self.assertRaisesMessage(CommandError, 'line 1'):
+            self.import_file(path)
+        self.assertFalse(Recipe.objects.filter(user=self.other).exists())
+
+    def test_unknown_user(self):
+        """ Probar que una fila de un usuario inexistente es rechazada """
+        path = os.path.join(self.directory, 'bad.ndjson')
+        with open(path, 'w') as fp:
+            fp.write('{"user": "nobody@test.com", "title": "Soup", "time_minutes": 5, "price": "1"}\n')
+
+        with self.assertRaisesMessage(CommandError, 'unknown user'):
+            self.import_file(path)
+
+    def test_user_not_string(self):
+        """ Probar que una fila con un usuario que no es texto es rechazada """
+        path = os.path.join(self.directory, 'bad.ndjson')
+        with open(path, 'w') as fp:
+            fp.write('{"user": 123, "title": "Soup", "time_minutes": 5, "price": "1"}\n')
+
+        with self.assertRaisesMessage(CommandError, 'line 1: user must be an email address'):
+            self.import_file(path)
+
+    def test_user_partition(self):
+        """ Probar que la particion de un usuario es estable y esta en rango """
+        self.assertEqual(user_partition('Test@test.com', 4), user_partition('test@test.com', 4))
+        self.assertIn(user_partition('test@test.com', 3), range(3))
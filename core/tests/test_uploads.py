@@ -0,0 +1,81 @@
+import hashlib
+import io
+
+from django.test import TestCase, override_settings
+from django.core.files.uploadhandler import SkipFile
+from PIL import Image
+
+from core.uploads import ImageUploadHandler, read_image_header
+
+
+def image_bytes(size=(50, 40), fmt='JPEG', exif_size=0):
+    exif = Image.Exif()
+    if exif_size:
+        exif[0x010e] = 'x' * exif_size
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'blue').save(buffer, format=fmt, exif=exif)
+    return buffer.getvalue()
+
+
+class ReadImageHeaderTest(TestCase):
+
+    def test_header_from_first_bytes(self):
+        """ Probar que el formato y tamaño se leen sin el resto del archivo """
+        data = image_bytes(fmt='PNG') + b'\0' * 1000
+        self.assertEqual(read_image_header(data[:64]), ('PNG', (50, 40)))
+
+    def test_incomplete_header(self):
+        """ Probar que una cabecera incompleta pide mas bytes """
+        data = image_bytes(exif_size=20000)
+        self.assertIsNone(read_image_header(data[:1000]))
+        self.assertEqual(read_image_header(data), ('JPEG', (50, 40)))
+
+
+@override_settings(RECIPE_IMAGE_UPLOAD={'CHUNK_SIZE': 1024, 'HEADER_SIZE': 4096, 'MAX_SIZE': 64 * 1024})
+class ImageUploadHandlerTest(TestCase):
+
+    def upload(self, data):
+        """ Envia los datos al handler por bloques; retorna el archivo, los errores y si se descarto """
+        handler = ImageUploadHandler()
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', len(data))
+        for start in range(0, len(data), handler.chunk_size):
+            try:
+                handler.receive_data_chunk(data[start:start + handler.chunk_size], start)
+            except SkipFile:
+                return None, handler.errors, True
+        return handler.file_complete(len(data)), handler.errors, False
+
+    def test_valid_image(self):
+        """ Probar que una imagen valida se recibe con su hash calculado """
+        data = image_bytes(exif_size=2000)
+        uploaded, errors, skipped = self.upload(data)
+
+        self.assertEqual(errors, {})
+        self.assertEqual(uploaded.image_format, 'JPEG')
+        self.assertEqual(uploaded.read(), data)
+        self.assertEqual(uploaded.sha256, hashlib.sha256(data).hexdigest())
+
+    def test_header_not_found(self):
+        """ Probar que se rechaza un archivo sin cabecera de imagen en los primeros bytes """
+        uploaded, errors, skipped = self.upload(b'x' * 10000)
+        self.assertTrue(skipped)
+        self.assertIn('image', errors)
+
+    def test_size_limit(self):
+        """ Probar que se corta la subida al superar el tamaño maximo """
+        uploaded, errors, skipped = self.upload(image_bytes() + b'\0' * 70 * 1024)
+        self.assertTrue(skipped)
+        self.assertIn('no more than', errors['image'])
+
+    @override_settings(RECIPE_IMAGE_UPLOAD={'MAX_PIXELS': 1000})
+    def test_decompression_bomb(self):
+        """ Probar que se rechazan dimensiones enormes sin decodificar la imagen """
+        uploaded, errors, skipped = self.upload(image_bytes(size=(100, 100), fmt='PNG'))
+        self.assertIsNone(uploaded)
+        self.assertIn('too large', errors['image'])
+
+    def test_unsupported_format(self):
+        """ Probar que se rechazan formatos no permitidos """
+        uploaded, errors, skipped = self.upload(image_bytes(fmt='GIF'))
+        self.assertIsNone(uploaded)
+        self.assertIn('GIF', errors['image'])
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from core.images import FORMAT_EXTENSIONS, render_image
+
+# Extension de la URL a formato de Pillow
+EXTENSION_FORMATS = {ext: fmt for fmt, ext in FORMAT_EXTENSIONS.items()}
+
+# Tras una eviccion se deja el cache por debajo de esta fraccion del limite
+EVICTION_TARGET = 0.9
+
+# Un acierto solo actualiza la fecha de uso si es mas antigua que esto, en segundos
+TOUCH_INTERVAL = 3600
+
+
+def thumbnail_options():
+    options = {
+        'CACHE_DIR': os.path.join(settings.MEDIA_ROOT, 'cache', 'thumbnails'),
+        'MAX_SIZE': 512 * 1024 * 1024,
+        'SIZES': ((96, 96), (192, 192), (384, 384), (768, 768)),
+    }
+    options.update(getattr(settings, 'RECIPE_THUMBNAILS', {}))
+    return options
+
+
+class ThumbnailCache:
+    """ Cache en disco repartido en subdirectorios, con limite de tamaño y eviccion LRU """
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        self._size = None
+        self._size_lock = threading.Lock()
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def path(self, name):
+        """ Ruta de una entrada: dos niveles de directorios tomados del hash del nombre """
+        digest = hashlib.sha256(name.encode('utf-8')).hexdigest()
+        ext = os.path.splitext(name)[1]
+        return os.path.join(self.directory, digest[:2], digest[2:4], digest + ext)
+
+    def get(self, path):
+        """ Retorna la ruta si existe, marcandola como usada recientemente """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        if now - stat.st_mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(path, (now, now))
+            except FileNotFoundError:
+                return None
+        return path
+
+    def put(self, path, content):
+        """ Escribe la entrada de forma atomica y libera espacio si hace falta """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._size_lock:
+            if self._size is None:
+                self._size = self.disk_usage()
+            else:
+                self._size += len(content)
+            if self._size > self.max_size:
+                self._size = self.evict()
+
+    def remove(self, path):
+        """ Borra una entrada si existe """
+        try:
+            size = os.stat(path).st_size
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self._size_lock:
+            if self._size is not None:
+                self._size -= size
+
+    def entries(self):
+        """ (mtime, tamaño, ruta) de cada entrada del cache """
+        for root, dirs, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def disk_usage(self):
+        return sum(size for mtime, size, path in self.entries())
+
+    def evict(self):
+        """ Borra las entradas usadas hace mas tiempo y retorna el tamaño resultante """
+        entries = sorted(self.entries())
+        size = sum(entry[1] for entry in entries)
+        target = self.max_size * EVICTION_TARGET
+        for mtime, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        return size
+
+    @contextmanager
+    def lock(self, path):
+        """ Un solo hilo genera cada entrada; los demas esperan su resultado """
+        with self._locks_lock:
+            lock, waiters = self._locks.get(path, (None, 0))
+            if lock is None:
+                lock = threading.Lock()
+            self._locks[path] = (lock, waiters + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._locks_lock:
+                lock, waiters = self._locks[path]
+                if waiters == 1:
+                    del self._locks[path]
+                else:
+                    self._locks[path] = (lock, waiters - 1)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """ Cache compartido del proceso, recreado si cambia la configuracion """
+    global _cache
+    options = thumbnail_options()
+    with _cache_lock:
+        if _cache is None or (_cache.directory, _cache.max_size) != (options['CACHE_DIR'], options['MAX_SIZE']):
+            _cache = ThumbnailCache(options['CACHE_DIR'], options['MAX_SIZE'])
+        return _cache
+
+
+def get_thumbnail(key, width, height, ext, find_source):
+    """ Ruta en disco de la miniatura, generandola la primera vez; None si no hay imagen """
+    cache = get_cache()
+    path = cache.path(f'{key}/{width}x{height}.{ext}')
+    if cache.get(path):
+        return path
+
+    with cache.lock(path):
+        # Otro hilo pudo generarla mientras esperabamos
+        if cache.get(path):
+            return path
+        source = find_source(key)
+        if source is None:
+            return None
+        with default_storage.open(source, 'rb') as fp:
+            with Image.open(fp) as image:
+                content = render_image(image, (width, height), EXTENSION_FORMATS[ext])
+        cache.put(path, content)
+    return path
+
+
+def delete_thumbnails(key):
+    """ Borra del cache las miniaturas de una imagen en todos los tamaños y formatos servidos """
+    cache = get_cache()
+    for width, height in thumbnail_options()['SIZES']:
+        for ext in EXTENSION_FORMATS:
+            cache.remove(cache.path(f'{key}/{width}x{height}.{ext}'))
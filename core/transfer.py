@@ -0,0 +1,195 @@
+import csv
+import json
+import zlib
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from core.bulk import create_names, create_recipes
+from core.models import Ingredient, Recipe, Tag
+
+FORMATS = ('ndjson', 'csv')
+
+# Columnas exportadas, en el orden del CSV
+COLUMNS = ('user', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients')
+
+# Campos de la receta que vienen en cada fila
+RECIPE_FIELDS = ('title', 'time_minutes', 'price', 'link')
+
+# Relacion de la receta a su modelo y columna desnormalizada de ids
+RELATIONS = (
+    ('tags', Tag, 'tag_ids'),
+    ('ingredients', Ingredient, 'ingredient_ids'),
+)
+
+# Ids por consulta al buscar nombres, por debajo del limite de variables de SQLite
+LOOKUP_BATCH_SIZE = 500
+
+
+class RowError(ValueError):
+    """ Fila invalida en un archivo de importacion """
+
+
+def chunks(iterable, size):
+    """ Listas de hasta size elementos tomadas de iterable sin cargarlo completo """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def user_partition(email, workers):
+    """ Proceso que atiende al usuario; estable entre ejecuciones y procesos """
+    return zlib.crc32(email.lower().encode('utf-8')) % workers
+
+
+def export_rows(user, chunk_size):
+    """ Filas de las recetas del usuario, leyendo chunk_size recetas y sus nombres por consulta """
+    recipes = (
+        Recipe.objects.filter(user=user).order_by('id')
+        .only('id', *RECIPE_FIELDS, 'tag_ids', 'ingredient_ids')
+        .iterator(chunk_size=chunk_size)
+    )
+    for chunk in chunks(recipes, chunk_size):
+        names = {}
+        for field_name, model, ids_field in RELATIONS:
+            ids = sorted({pk for recipe in chunk for pk in getattr(recipe, ids_field)})
+            names[field_name] = {}
+            for batch in chunks(ids, LOOKUP_BATCH_SIZE):
+                names[field_name].update(model.objects.filter(id__in=batch).values_list('id', 'name'))
+        for recipe in chunk:
+            row = {'user': user.email}
+            row.update({field: getattr(recipe, field) for field in RECIPE_FIELDS})
+            row['price'] = str(recipe.price)
+            for field_name, model, ids_field in RELATIONS:
+                row[field_name] = [names[field_name][pk] for pk in getattr(recipe, ids_field)]
+            yield row
+
+
+def write_rows(rows, fp, fmt):
+    """ Escribe las filas como NDJSON o CSV; las listas de nombres van como arreglos JSON en el CSV """
+    if fmt == 'csv':
+        writer = csv.DictWriter(fp, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({
+                **row,
+                'tags': json.dumps(row['tags'], ensure_ascii=False),
+                'ingredients': json.dumps(row['ingredients'], ensure_ascii=False),
+            })
+        return
+    for row in rows:
+        fp.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def read_rows(fp, fmt):
+    """ (numero de linea, fila) de un archivo NDJSON o CSV, leido de a una linea """
+    if fmt == 'csv':
+        reader = csv.DictReader(fp)
+        for row in reader:
+            try:
+                for field_name, model, ids_field in RELATIONS:
+                    row[field_name] = json.loads(row.get(field_name) or '[]')
+            except ValueError as exc:
+                raise RowError(f'line {reader.line_num}: {exc}')
+            yield reader.line_num, row
+        return
+    for line_num, line in enumerate(fp, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise RowError(f'line {line_num}: {exc}')
+        if not isinstance(row, dict):
+            raise RowError(f'line {line_num}: expected an object')
+        yield line_num, row
+
+
+def build_recipe(user, line_num, row):
+    """ Receta sin guardar de una fila """
+    recipe = Recipe(user=user, **{field: row.get(field) for field in RECIPE_FIELDS if row.get(field) is not None})
+    try:
+        recipe.clean_fields(exclude=('user', 'image', 'image_renditions', 'tag_ids', 'ingredient_ids'))
+    except ValidationError as exc:
+        raise RowError(f'line {line_num}: {exc.message_dict}')
+    return recipe
+
+
+@transaction.atomic
+def import_user_rows(user, rows, batch_size):
+    """ Crea las recetas de un lote de filas del usuario con inserciones en lote """
+    related = {}
+    for field_name, model, ids_field in RELATIONS:
+        max_length = model._meta.get_field('name').max_length
+        names = {}
+        for line_num, row in rows:
+            values = row.get(field_name) or []
+            if not isinstance(values, list):
+                raise RowError(f'line {line_num}: {field_name} must be a list of names')
+            for name in values:
+                if not isinstance(name, str) or not name or len(name) > max_length:
+                    raise RowError(f'line {line_num}: invalid {field_name} name {name!r}')
+                names[name] = None
+        related[field_name] = create_names(model, user, names)
+
+    recipes = [build_recipe(user, line_num, row) for line_num, row in rows]
+    relations = [
+        {field_name: [related[field_name][name].pk for name in row.get(field_name) or []] for field_name in related}
+        for line_num, row in rows
+    ]
+    create_recipes(recipes, relations, batch_size)
+    return len(recipes)
+
+
+def import_rows(rows, batch_size, user=None, partition=None):
+    """ Importa las filas por lotes; user reemplaza al de cada fila y partition=(indice, procesos) filtra usuarios """
+    users = {}
+    imported = 0
+    if user is not None:
+        users[user.email] = user
+    for batch in chunks(rows, batch_size):
+        by_user = {}
+        for line_num, row in batch:
+            email = user.email if user is not None else row.get('user')
+            if not email:
+                raise RowError(f'line {line_num}: missing user')
+            if not isinstance(email, str):
+                raise RowError(f'line {line_num}: user must be an email address')
+            if partition is not None and user_partition(email, partition[1]) != partition[0]:
+                continue
+            by_user.setdefault(email, []).append((line_num, row))
+
+        for email, user_rows in by_user.items():
+            if email not in users:
+                try:
+                    users[email] = get_user_model().objects.get(email=email)
+                except get_user_model().DoesNotExist:
+                    raise RowError(f'line {user_rows[0][0]}: unknown user {email}')
+            imported += import_user_rows(users[email], user_rows, batch_size)
+    return imported
+
+
+def export_user_file(user_id, path, fmt, chunk_size):
+    """ Exporta las recetas de un usuario a su archivo; se ejecuta en un proceso del pool """
+    user = get_user_model().objects.get(pk=user_id)
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as fp:
+        def counted():
+            nonlocal count
+            for row in export_rows(user, chunk_size):
+                count += 1
+                yield row
+        write_rows(counted(), fp, fmt)
+    return count
+
+
+def import_file(path, fmt, batch_size, user_id=None, partition=None):
+    """ Importa un archivo completo, o solo los usuarios de partition; se ejecuta en un proceso del pool """
+    user = get_user_model().objects.get(pk=user_id) if user_id is not None else None
+    with open(path, encoding='utf-8', newline='') as fp:
+        return import_rows(read_rows(fp, fmt), batch_size, user=user, partition=partition)
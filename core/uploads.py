@@ -0,0 +1,105 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.utils.translation import gettext as _
+from PIL import Image
+
+
+def upload_options():
+    options = {
+        'MAX_SIZE': 10 * 1024 * 1024,
+        'MAX_PIXELS': 40000000,
+        'CHUNK_SIZE': 64 * 1024,
+        'HEADER_SIZE': 256 * 1024,
+        'FORMATS': ('JPEG', 'PNG', 'WEBP'),
+    }
+    options.update(getattr(settings, 'RECIPE_IMAGE_UPLOAD', {}))
+    return options
+
+
+def read_image_header(data):
+    """ Formato y tamaño de la imagen leyendo solo la cabecera, o None si faltan bytes """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return image.format, image.size
+    except OSError:
+        # Formato desconocido o cabecera incompleta
+        return None
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """ Escribe la imagen subida por bloques a un archivo temporal validando tamaño y cabecera """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.options = upload_options()
+        self.chunk_size = self.options['CHUNK_SIZE']
+        self.errors = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = TemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.sha256 = hashlib.sha256()
+        self.header = b''
+        self.image_format = None
+
+    def reject(self, message):
+        """ Descarta el archivo y recuerda el error para la vista """
+        self.errors[self.field_name] = message
+        self.file.close()
+
+    def check_header(self, final=False):
+        """ Valida formato y dimensiones en cuanto hay bytes suficientes, sin decodificar pixeles """
+        try:
+            header = read_image_header(self.header)
+        except Image.DecompressionBombError:
+            return _('Image dimensions are too large.')
+        if header is None:
+            if final or len(self.header) >= self.options['HEADER_SIZE']:
+                return _('Upload a valid image. The file you uploaded was either not an image or a corrupted image.')
+            return None
+
+        image_format, (width, height) = header
+        if image_format not in self.options['FORMATS']:
+            return _('Unsupported image format {image_format}.').format(image_format=image_format)
+        if width * height > self.options['MAX_PIXELS']:
+            return _('Image dimensions are too large.')
+        self.image_format = image_format
+        self.header = b''
+        return None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.options['MAX_SIZE']:
+            self.reject(
+                _('Ensure this file has no more than {max_size} bytes.').format(max_size=self.options['MAX_SIZE'])
+            )
+            raise SkipFile()
+        if self.image_format is None:
+            self.header += raw_data
+            error = self.check_header()
+            if error:
+                self.reject(error)
+                raise SkipFile()
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.image_format is None:
+            error = self.check_header(final=True)
+            if error:
+                # Sin archivo el campo queda vacio; la vista reporta el error
+                self.reject(error)
+                return None
+        self.file.seek(0)
+        self.file.size = file_size
+        # Usados por el almacenamiento y el serializador para no volver a leer el archivo
+        self.file.sha256 = self.sha256.hexdigest()
+        self.file.image_format = self.image_format
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            self.file.close()
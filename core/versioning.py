@@ -0,0 +1,22 @@
+from core.models import DataVersion
+
+
+def get_data_version(user_id, using='default'):
+    """ Retorna la version actual de los datos de recetas del usuario """
+    versions = list(DataVersion.objects.using(using).filter(user_id=user_id).values_list('version', flat=True))
+    return versions[0] if versions else 0
+
+
+def bump_data_version(user_id, using='default'):
+    """ Incrementa la version del usuario dentro de la transaccion en curso y la retorna """
+    return DataVersion.objects.db_manager(using).bump(user_id)
+
+
+def reserve_data_versions(user_id, count, using='default'):
+    """ Reserva count versiones consecutivas del usuario y retorna la ultima """
+    return DataVersion.objects.db_manager(using).reserve(user_id, count)
+
+
+def shared_data_version(user_id, using='default'):
+    """ Transaccion en que las escrituras del usuario comparten una sola version """
+    return DataVersion.objects.db_manager(using).shared(user_id)
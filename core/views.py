@@ -0,0 +1,40 @@
+import os
+
+from django.http import FileResponse, Http404, HttpResponse
+from django.views.decorators.http import require_safe
+
+from core.models import Recipe
+from core.thumbnails import EXTENSION_FORMATS, get_thumbnail, thumbnail_options
+
+
+def find_recipe_image(key):
+    """ Imagen original de receta cuyo nombre de archivo es key """
+    return Recipe.objects.filter(
+        image__startswith=f'uploads/recipe/{key}.'
+    ).values_list('image', flat=True).first()
+
+
+@require_safe
+def recipe_thumbnail(request, key, width, height, ext):
+    """ Sirve una miniatura de la imagen de una receta, generandola la primera vez """
+    options = thumbnail_options()
+    # Sin autenticacion: solo los tamaños configurados, para no generar uno por cada URL posible
+    sizes = {tuple(size) for size in options['SIZES']}
+    if ext not in EXTENSION_FORMATS or (width, height) not in sizes:
+        raise Http404
+
+    path = get_thumbnail(key, width, height, ext, find_recipe_image)
+    if path is None:
+        raise Http404
+
+    content_type = f'image/{EXTENSION_FORMATS[ext]}'
+    if options.get('SENDFILE_HEADER'):
+        # El servidor web envia el archivo, Django solo indica cual
+        response = HttpResponse(content_type=content_type)
+        relative = os.path.relpath(path, options['CACHE_DIR']).replace(os.sep, '/')
+        response[options['SENDFILE_HEADER']] = options.get('SENDFILE_PREFIX', '') + relative
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    # La clave cambia con cada imagen subida, la miniatura nunca cambia
+    response['Cache-Control'] = options.get('CACHE_CONTROL', 'public, max-age=31536000, immutable')
+    return response
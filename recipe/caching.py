@@ -0,0 +1,74 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from core.versioning import get_data_version
+
+
+def _options():
+    return getattr(settings, 'API_RESPONSE_CACHE', {})
+
+
+class ConditionalListMixin:
+    """ Responde listados con ETag por usuario, 304 y cuerpos renderizados en cache """
+    list_etag = None
+
+    def get_list_etag(self):
+        """ ETag derivado de la version de datos del usuario y de la peticion """
+        request = self.request
+        parts = (
+            str(request.user.pk),
+            str(get_data_version(request.user.pk)),
+            request.build_absolute_uri(),
+            request.accepted_media_type or '',
+        )
+        return '"%s"' % hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        """ Listar usando la ETag para evitar consultar y serializar """
+        etag = self.get_list_etag()
+        # Comparacion debil: CompressionMiddleware envia la ETag como W/"..."
+        client_etags = [
+            tag[2:] if tag.startswith('W/') else tag
+            for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        ]
+        if etag in client_etags:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        cache = caches[_options().get('CACHE_ALIAS', 'default')]
+        cached = cache.get('list-body:' + etag)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['ETag'] = etag
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            response['ETag'] = etag
+            self.list_etag = etag
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.list_etag is not None and isinstance(response, Response):
+            response.add_post_render_callback(self.store_rendered_list)
+        return response
+
+    def store_rendered_list(self, response):
+        """ Guarda el cuerpo renderizado si no supera el tamaño maximo """
+        options = _options()
+        if len(response.content) > options.get('MAX_BODY_SIZE', 256 * 1024):
+            return
+        cache = caches[options.get('CACHE_ALIAS', 'default')]
+        cache.set(
+            'list-body:' + self.list_etag,
+            (response.content, response['Content-Type']),
+            options.get('TIMEOUT', 600)
+        )
@@ -0,0 +1,127 @@
+import base64
+import binascii
+import heapq
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import MAX_ID, Ingredient, Recipe, Tag, Tombstone
+from core.versioning import get_data_version
+
+# Fuentes de cambios en el orden que desempata un mismo numero de cambio; el indice es parte del cursor
+SOURCES = (
+    ('tags', Tag),
+    ('ingredients', Ingredient),
+    ('recipes', Recipe),
+    ('deleted', Tombstone),
+)
+
+# Nombre de modelo de la lapida a la clave de la respuesta
+DELETED_KEYS = {
+    Tombstone.TAG: 'tags',
+    Tombstone.INGREDIENT: 'ingredients',
+    Tombstone.RECIPE: 'recipes',
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+MAX_MICROS = (datetime.max.replace(tzinfo=dt_timezone.utc) - EPOCH) // timedelta(microseconds=1)
+
+
+def sync_options():
+    options = {
+        'PAGE_SIZE': 500,
+        'TOMBSTONE_RETENTION_DAYS': 90,
+    }
+    options.update(getattr(settings, 'RECIPE_SYNC', {}))
+    return options
+
+
+class CursorExpired(Exception):
+    """ El cursor es anterior a las lapidas conservadas; el cliente debe descargar todo """
+
+
+def encode_cursor(position, issued):
+    """ Cursor opaco con la posicion (numero de cambio, fuente, id) del ultimo cambio entregado y su fecha """
+    micros = (issued - EPOCH) // timedelta(microseconds=1)
+    text = '.'.join(str(part) for part in (*position, micros))
+    return base64.urlsafe_b64encode(text.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """ Posicion y fecha de un cursor; ValueError si no es valido """
+    try:
+        text = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+        parts = [int(part) for part in text.split('.')]
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if len(parts) == 3:
+        # Cursor de cuando los cambios se ordenaban por fecha: no se puede convertir
+        raise CursorExpired()
+    if len(parts) != 4:
+        raise ValueError('Invalid cursor')
+    seq, source, pk, micros = parts
+    if not (0 <= seq <= MAX_ID and 0 <= source <= len(SOURCES) and 0 <= pk <= MAX_ID and 0 <= micros <= MAX_MICROS):
+        raise ValueError('Invalid cursor')
+    return (seq, source, pk), EPOCH + timedelta(microseconds=micros)
+
+
+def _after(position, index):
+    """ Condicion de las filas de la fuente index posteriores a position """
+    seq, source, pk = position
+    if index < source:
+        return Q(change_seq__gt=seq)
+    if index == source:
+        return Q(change_seq__gt=seq) | Q(change_seq=seq, pk__gt=pk)
+    return Q(change_seq__gte=seq)
+
+
+def _positioned(rows, index, key):
+    """ Filas de una fuente con su clave de orden para mezclarlas """
+    for row in rows:
+        yield (row.change_seq, index, row.pk), key, row
+
+
+def changes_since(user, cursor=None):
+    """ Objetos del usuario modificados o eliminados despues del cursor, a lo sumo PAGE_SIZE """
+    options = sync_options()
+    now = timezone.now()
+    limit = options['PAGE_SIZE']
+
+    position = None
+    if cursor:
+        position, issued = decode_cursor(cursor)
+        if issued < now - timedelta(days=options['TOMBSTONE_RETENTION_DAYS']):
+            raise CursorExpired()
+
+    # Los numeros de cambio se confirman en orden (ver DataVersion): todo lo que llega
+    # hasta la version leida antes de consultar ya esta confirmado y se ve en las consultas
+    committed = get_data_version(user.pk)
+
+    streams = []
+    for index, (key, model) in enumerate(SOURCES):
+        if model is Tombstone and position is None:
+            # Una sincronizacion completa no necesita borrados
+            continue
+        queryset = model.objects.filter(user=user)
+        if position is not None:
+            queryset = queryset.filter(_after(position, index))
+        streams.append(_positioned(queryset.order_by('change_seq', 'pk')[:limit + 1], index, key))
+
+    result = {key: [] for key, model in SOURCES if model is not Tombstone}
+    result['deleted'] = {key: [] for key in DELETED_KEYS.values()}
+    last = position or (0, 0, 0)
+    merged = heapq.merge(*streams, key=lambda item: item[0])
+    for count, (position_key, key, row) in enumerate(merged):
+        if count == limit:
+            return result, encode_cursor(last, now), True
+        if key == 'deleted':
+            result['deleted'][DELETED_KEYS[row.model]].append(row.object_id)
+        else:
+            result[key].append(row)
+        last = position_key
+
+    # Todo lo confirmado hasta la version leida fue entregado
+    return result, encode_cursor(max(last, (committed, len(SOURCES), 0)), now), False
@@ -0,0 +1,19 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class BaseCursorPagination(CursorPagination):
+    """ Paginacion por cursor opaco, el costo no depende de la pagina """
+    page_size = getattr(settings, 'API_PAGE_SIZE', 100)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+
+
+class NameCursorPagination(BaseCursorPagination):
+    """ Paginacion de tags e ingredientes ordenados por nombre """
+    ordering = ('name', 'id')
+
+
+class RecipeCursorPagination(BaseCursorPagination):
+    """ Paginacion de recetas ordenadas por id """
+    ordering = ('id',)
@@ -0,0 +1,21 @@
+from rest_framework.renderers import BaseRenderer
+
+from core.renderers import json_dumps
+
+
+class NDJSONRenderer(BaseRenderer):
+    """ Renderiza una lista como un objeto JSON por linea """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render_row(self, data):
+        """ Codifica un objeto como una linea """
+        return json_dumps(data) + b'\n'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = [data]
+        return b''.join(self.render_row(item) for item in data)
@@ -1,40 +1,230 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.utils import html
 
-from core.models import Tag, Ingredient, Recipe
+from core.bulk import create_names, create_recipes
+from core.metrics import TimedSerializerMixin
+from core.models import MAX_ID, Tag, Ingredient, Recipe
+from core.summaries import recipe_changes
 
-class TagSerializer(serializers.ModelSerializer):
+class RenditionsField(serializers.ReadOnlyField):
+    """ Retorna las URLs de las rendiciones de la imagen """
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for name, path in value.items():
+            url = default_storage.url(path)
+            urls[name] = request.build_absolute_uri(url) if request is not None else url
+        return urls
+
+class NameOrIdRelatedField(serializers.Field):
+    """ Lista de tags o ingredientes del usuario por id o por nombre; los nombres nuevos se crean al guardar """
+    default_error_messages = {
+        'not_a_list': _('Expected a list of items but got type "{input_type}".'),
+        'incorrect_type': _('Incorrect type. Expected pk value or name, received {data_type}.'),
+        'does_not_exist': _('Invalid pk "{pk_value}" - object does not exist.'),
+        'max_length': _('Ensure this name has no more than {max_length} characters.'),
+    }
+    initial = []
+    default_empty_html = []
+
+    def __init__(self, model, summary=None, **kwargs):
+        self.model = model
+        self.summary = summary
+        super().__init__(**kwargs)
+
+    def get_value(self, dictionary):
+        if html.is_html_input(dictionary):
+            if self.field_name not in dictionary:
+                if getattr(self.root, 'partial', False):
+                    return empty
+                return self.default_empty_html
+            return dictionary.getlist(self.field_name)
+        return dictionary.get(self.field_name, empty)
+
+    def to_internal_value(self, data):
+        """ Resolver ids y nombres con una consulta cada uno """
+        if isinstance(data, (str, dict)) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+
+        ids, names = [], []
+        for item in data:
+            if isinstance(item, bool) or not isinstance(item, (int, str)):
+                self.fail('incorrect_type', data_type=type(item).__name__)
+            # isdigit tambien acepta digitos no ASCII como '²', que int() rechaza
+            if isinstance(item, int) or (item.isascii() and item.isdigit()):
+                ids.append(int(item))
+            elif item.strip():
+                names.append(item.strip())
+
+        max_length = self.model._meta.get_field('name').max_length
+        for name in names:
+            if len(name) > max_length:
+                self.fail('max_length', max_length=max_length)
+
+        user = self.context['request'].user
+        objects = {}
+        if ids:
+            for pk in ids:
+                # Fuera del rango de la columna la consulta fallaria
+                if not 0 < pk <= MAX_ID:
+                    self.fail('does_not_exist', pk_value=pk)
+            objects.update(self.model.objects.filter(user=user, id__in=ids).in_bulk())
+            for pk in ids:
+                if pk not in objects:
+                    self.fail('does_not_exist', pk_value=pk)
+        if names:
+            existing = {obj.name: obj for obj in self.model.objects.filter(user=user, name__in=names)}
+            for name in dict.fromkeys(names):
+                # Sin pk: se crea en save_related
+                obj = existing.get(name) or self.model(user=user, name=name)
+                objects[obj.pk or name] = obj
+        return list(objects.values())
+
+    def get_attribute(self, instance):
+        if self.summary and self.context.get('summaries'):
+            # Ids desnormalizados en la receta, sin leer la tabla intermedia
+            return getattr(instance, self.summary)
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        if isinstance(value, list):
+            return value
+        return [obj.pk for obj in value.all()]
+
+def save_related(objects):
+    """ Crea los objetos sin pk con un bulk_create y retorna todos con pk """
+    new = [obj for obj in objects if obj.pk is None]
+    if not new:
+        return objects
+    created = create_names(type(new[0]), new[0].user, [obj.name for obj in new])
+    return [obj if obj.pk is not None else created[obj.name] for obj in objects]
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """ Serializador para objeto del Tag """
     class Meta:
         model = Tag
         fields = ('id', 'name')
         read_only_Fields = ('id',)
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """ Serializador para objeto de los ingredinetes """
     class Meta:
         model = Ingredient
         fields = ('id', 'name')
         read_only_Fields = ('id',)
 
-class RecipeSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """ Limita los campos a context['fields'] y anida las relaciones de context['expand'] """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in self.context.get('expand', ()):
+            if name in self.fields and name in self.expandable_fields:
+                self.fields[name] = self.expandable_fields[name](many=True, read_only=True)
+
+class RecipeSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     """ Serializador para objeto de los ingredientes """
-    ingredients = serializers.PrimaryKeyRelatedField(many=True, queryset=Ingredient.objects.all())
-    tags = serializers.PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    ingredients = NameOrIdRelatedField(Ingredient, summary='ingredient_ids')
+    tags = NameOrIdRelatedField(Tag, summary='tag_ids')
+    ingredient_count = serializers.IntegerField(read_only=True)
+    renditions = RenditionsField(source='image_renditions')
+    expandable_fields = {'ingredients': IngredientSerializer, 'tags': TagSerializer}
 
     class Meta:
         model = Recipe
-        fields = ('id','title', 'time_minutes', 'price', 'link', 'ingredients', 'tags')
+        fields = ('id','title', 'time_minutes', 'price', 'link', 'ingredients', 'tags', 'ingredient_count', 'renditions')
         read_only_Fields = ('id',)
 
+    def save_related(self, validated_data):
+        """ Crear los tags e ingredientes nuevos antes de asignarlos """
+        for field_name in ('ingredients', 'tags'):
+            if field_name in validated_data:
+                validated_data[field_name] = save_related(validated_data[field_name])
+
+    def create(self, validated_data):
+        # Una version, un recalculo de resumenes y una reindexacion por receta guardada
+        with recipe_changes(validated_data['user'].pk):
+            self.save_related(validated_data)
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with recipe_changes(instance.user_id):
+            self.save_related(validated_data)
+            return super().update(instance, validated_data)
+
 class RecipeDetailSerializer(RecipeSerializer):
     """ Serializar los detalles de una receta """
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
 
-class RecipeImageSerializer(serializers.ModelSerializer):
-    """ Serializar las imagenes """
+class RecipeBulkListSerializer(serializers.ListSerializer):
+    """ Valida y crea un lote de recetas con pocas consultas """
+    related_models = {'ingredients': Ingredient, 'tags': Tag}
+
+    def validate(self, attrs):
+        """ Resolver todos los ingredientes y tags del lote con una consulta por modelo """
+        max_items = getattr(settings, 'RECIPE_BULK_MAX_ITEMS', 1000)
+        if len(attrs) > max_items:
+            raise serializers.ValidationError(
+                _('Ensure this list has no more than {max_items} items.').format(max_items=max_items)
+            )
+
+        user = self.context['request'].user
+        for field_name, model in self.related_models.items():
+            requested = {pk for item in attrs for pk in item.get(field_name, ())}
+            found = set(
+                model.objects.filter(user=user, id__in=requested).values_list('id', flat=True)
+            )
+            missing = sorted(requested - found)
+            if missing:
+                raise serializers.ValidationError({
+                    field_name: [_('Invalid pk "{pk}" - object does not exist.').format(pk=pk) for pk in missing]
+                })
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """ Crear recetas y sus relaciones con inserciones en lote """
+        relations = [
+            {field_name: item.pop(field_name, ()) for field_name in self.related_models}
+            for item in validated_data
+        ]
+        return create_recipes([Recipe(**item) for item in validated_data], relations)
+
+class RecipeBulkSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """ Serializar una receta dentro de una creacion en lote """
+    ingredients = serializers.ListField(child=serializers.IntegerField(min_value=1, max_value=MAX_ID), required=False)
+    tags = serializers.ListField(child=serializers.IntegerField(min_value=1, max_value=MAX_ID), required=False)
+
     class Meta:
         model = Recipe
-        fields = ('id','image')
+        fields = ('id','title', 'time_minutes', 'price', 'link', 'ingredients', 'tags')
         read_only_Fields = ('id',)
+        list_serializer_class = RecipeBulkListSerializer
+
+class StreamedImageField(serializers.ImageField):
+    """ Imagen validada al recibirla por ImageUploadHandler; las demas se abren con Pillow """
+    def to_internal_value(self, data):
+        if getattr(data, 'image_format', None):
+            return serializers.FileField.to_internal_value(self, data)
+        return super().to_internal_value(data)
+
+class RecipeImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """ Serializar las imagenes """
+    image = StreamedImageField()
+    renditions = RenditionsField(source='image_renditions')
 
+    class Meta:
+        model = Recipe
+        fields = ('id','image', 'renditions')
+        read_only_Fields = ('id',)
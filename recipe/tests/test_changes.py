@@ -0,0 +1,136 @@
+import base64
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Ingredient, Recipe, Tag, Tombstone
+from recipe.changes import encode_cursor
+
+CHANGES_URL = reverse('recipe:changes')
+
+
+class ChangesTests(TestCase):
+    """ Probar la sincronizacion incremental con /changes/ """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@datadosis.com', 'Testpass')
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=5, price=1)
+        self.recipe.ingredients.add(self.salt)
+
+    def get_changes(self, since=None):
+        res = self.client.get(CHANGES_URL, {'since': since} if since else {})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_full_sync(self):
+        """ Probar que sin cursor se retorna todo el catalogo sin borrados """
+        data = self.get_changes()
+
+        self.assertEqual([tag['name'] for tag in data['tags']], ['Vegan'])
+        self.assertEqual([ingredient['id'] for ingredient in data['ingredients']], [self.salt.id])
+        self.assertEqual(data['recipes'][0]['ingredients'], [self.salt.id])
+        self.assertEqual(data['deleted'], {'tags': [], 'ingredients': [], 'recipes': []})
+        self.assertFalse(data['has_more'])
+
+    def test_only_changes_after_cursor(self):
+        """ Probar que solo se retornan los objetos modificados y eliminados """
+        cursor = self.get_changes()['cursor']
+        self.assertEqual(self.get_changes(cursor)['recipes'], [])
+
+        self.tag.name = 'Vegetarian'
+        self.tag.save()
+        pie = Recipe.objects.create(user=self.user, title='Pie', time_minutes=5, price=1)
+        deleted_id = self.salt.id
+        self.salt.delete()
+
+        data = self.get_changes(cursor)
+        self.assertEqual([tag['name'] for tag in data['tags']], ['Vegetarian'])
+        self.assertEqual(data['ingredients'], [])
+        # La receta que perdio el ingrediente tambien cambio
+        self.assertEqual({recipe['id'] for recipe in data['recipes']}, {self.recipe.id, pie.id})
+        self.assertEqual(data['deleted']['ingredients'], [deleted_id])
+
+    def test_pages(self):
+        """ Probar que las paginas se recorren sin repetir ni perder cambios """
+        cursor = self.get_changes()['cursor']
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+        Recipe.objects.filter(pk=self.recipe.pk).delete()
+
+        names, deleted, pages = [], [], 0
+        with override_settings(RECIPE_SYNC={'PAGE_SIZE': 2}):
+            while True:
+                data = self.get_changes(cursor)
+                names += [tag['name'] for tag in data['tags']]
+                deleted += data['deleted']['recipes']
+                cursor, pages = data['cursor'], pages + 1
+                if not data['has_more']:
+                    break
+
+        self.assertEqual(sorted(names), [f'Tag {i}' for i in range(5)])
+        self.assertEqual(deleted, [self.recipe.id])
+        self.assertEqual(pages, 3)
+
+    def test_limited_to_user(self):
+        """ Probar que no se retornan cambios de otros usuarios """
+        cursor = self.get_changes()['cursor']
+        other = get_user_model().objects.create_user('other@datadosis.com', 'Testpass')
+        Tag.objects.create(user=other, name='Other')
+        Recipe.objects.create(user=other, title='Other', time_minutes=5, price=1).delete()
+
+        data = self.get_changes(cursor)
+        self.assertEqual(data['tags'], [])
+        self.assertEqual(data['deleted']['recipes'], [])
+
+    def test_late_commit_not_skipped(self):
+        """ Probar que una escritura con fecha anterior al cursor, confirmada despues, se entrega """
+        started = timezone.now()
+        cursor = self.get_changes()['cursor']
+        # Una transaccion lenta fecha sus filas al guardarlas, antes de confirmar
+        with patch('django.utils.timezone.now', return_value=started - timedelta(minutes=5)):
+            Tag.objects.create(user=self.user, name='Slow')
+
+        data = self.get_changes(cursor)
+        self.assertEqual([tag['name'] for tag in data['tags']], ['Slow'])
+
+    def test_invalid_cursor(self):
+        """ Probar que un cursor invalido o fuera de rango es rechazado """
+        for text in ('not a cursor', '99999999999999999999.0.0.0', '1.0.0.99999999999999999999', '1.9.0.0'):
+            cursor = base64.urlsafe_b64encode(text.encode()).decode()
+            res = self.client.get(CHANGES_URL, {'since': cursor})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_cursor(self):
+        """ Probar que un cursor anterior a las lapidas conservadas pide descargar todo """
+        cursor = encode_cursor((0, 0, 0), timezone.now() - timedelta(days=365))
+        res = self.client.get(CHANGES_URL, {'since': cursor})
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+        # Los cursores por fecha anteriores tampoco sirven
+        legacy = base64.urlsafe_b64encode(b'1600000000000000.0.0').decode()
+        res = self.client.get(CHANGES_URL, {'since': legacy})
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+    def test_delete_user_with_recipes(self):
+        """ Probar que borrar un usuario en cascada registra las lapidas sin fallar """
+        self.user.delete()
+        self.assertEqual(Tombstone.objects.filter(model=Tombstone.RECIPE).count(), 1)
+
+    def test_delete_large_id(self):
+        """ Probar que se registra el borrado de un objeto con id mayor a 32 bits """
+        cursor = self.get_changes()['cursor']
+        tag = Tag.objects.create(id=2 ** 40, user=self.user, name='Grande')
+        tag.delete()
+
+        self.assertEqual(self.get_changes(cursor)['deleted']['tags'], [2 ** 40])
+        self.assertEqual(Tombstone._meta.get_field('object_id').get_internal_type(), 'BigIntegerField')
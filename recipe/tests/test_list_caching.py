@@ -0,0 +1,101 @@
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class ConditionalListTests(TestCase):
+    """ Probar ETags y cache de los listados """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@datadosis.com', 'Testpass')
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+
+    def test_not_modified_with_single_version_query(self):
+        """ Probar que If-None-Match responde 304 consultando solo la version de datos """
+        res = self.client.get(TAGS_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_cached_body_with_single_version_query(self):
+        """ Probar que el listado renderizado se sirve desde el cache consultando solo la version de datos """
+        first = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+
+    def test_change_invalidates_etag(self):
+        """ Probar que crear un tag cambia la ETag """
+        etag = self.client.get(TAGS_URL)['ETag']
+        Tag.objects.create(user=self.user, name='Quick')
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_version_shared_between_processes(self):
+        """ Probar que la version de datos no depende del cache local del proceso """
+        etag = self.client.get(TAGS_URL)['ETag']
+        # Otro proceso empieza con sus caches vacios
+        for alias in ('default', 'api'):
+            caches[alias].clear()
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Tag.objects.create(user=self.user, name='Quick')
+        caches['default'].clear()
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_relation_change_invalidates_etag(self):
+        """ Probar que asignar un tag a una receta cambia la ETag """
+        recipe = Recipe.objects.create(user=self.user, title='Curry', time_minutes=5, price=5.00)
+        etag = self.client.get(RECIPES_URL)['ETag']
+        recipe.tags.add(self.tag)
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['tags'], [self.tag.id])
+
+    def test_etag_per_user(self):
+        """ Probar que otro usuario no recibe el listado cacheado """
+        etag = self.client.get(TAGS_URL)['ETag']
+        user2 = get_user_model().objects.create_user('other@datadosis.com', 'Testpass')
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+
+    def test_cached_list_reads_primary(self):
+        """ Probar que el listado paginado no lee de la replica y el flujo si """
+        with patch('recipe.views.read_from_replica') as replica:
+            self.client.get(RECIPES_URL)
+            replica.assert_not_called()
+
+            self.client.get(RECIPES_URL, {'stream': '1'})
+            replica.assert_called_once()
@@ -1,15 +1,20 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import ImageJob, Recipe, Tag, Ingredient
+from recipe.pagination import RecipeCursorPagination
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
+import json
 import tempfile
 import os
+from unittest.mock import Mock, patch
 from PIL import Image
 
 def image_upload_url(recipe_id):
@@ -17,6 +22,8 @@ def image_upload_url(recipe_id):
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk-create')
+RECIPES_SEARCH_URL = reverse('recipe:recipe-search')
 
 def sample_tag(user, name='Main course'):
     """ Crear y retornar tag """
@@ -59,7 +66,7 @@ class PublicRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """ Probar obtener recetas para un usuario """
@@ -73,8 +80,8 @@ class PublicRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """ Probar ver los detalles de una receta """
@@ -170,8 +177,592 @@ class RecipeImgaeUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_queues_renditions(self):
+        """ Probar que subir imagen registra un trabajo de rendiciones """
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', (10, 10))
+            img.save(ntf, format='JPEG')
+            ntf.seek(0)
+            res = self.client.post(url, {'image':ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.data['renditions'], {})
+        job = ImageJob.objects.get(recipe=self.recipe)
+        self.assertEqual(job.source, self.recipe.image.name)
+        self.assertEqual(job.status, ImageJob.PENDING)
+
+    @override_settings(RECIPE_IMAGE_UPLOAD={'MAX_SIZE': 1024})
+    def test_upload_image_too_large(self):
+        """ Probar que se rechaza una imagen que supera el tamaño maximo """
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.png') as ntf:
+            Image.effect_noise((64, 64), 50).save(ntf, format='PNG')
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertFalse(ImageJob.objects.filter(recipe=self.recipe).exists())
+
+    def test_upload_not_an_image(self):
+        """ Probar que se rechaza un archivo que no es imagen """
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            ntf.write(b'not an image' * 100)
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
     def test_upload_image_bad_request(self):
         """ Probar subir imagen fallo """
         url = image_upload_url(self.recipe.id)
         res = self.client.post(url, {'image':'notimage'}, format='multipart')
-        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+class RecipeQueryCountTests(TestCase):
+    """ Probar que el numero de queries no depende del numero de recetas """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@test.com', 'testpass')
+        self.client.force_authenticate(self.user)
+
+    def create_recipes(self, count):
+        """ Crear recetas con tags e ingredientes """
+        tag, _ = Tag.objects.get_or_create(user=self.user, name='Main course')
+        ingredient, _ = Ingredient.objects.get_or_create(user=self.user, name='Salt')
+        for i in range(count):
+            recipe = sample_recipe(self.user, title=f'Recipe {i}')
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+        return recipe
+
+    def count_queries(self, url):
+        """ Retorna el numero de queries ejecutados por un GET """
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_constant(self):
+        """ Probar que listar recetas no hace N+1 queries """
+        self.create_recipes(2)
+        few = self.count_queries(RECIPES_URL)
+        self.create_recipes(10)
+        many = self.count_queries(RECIPES_URL)
+
+        self.assertEqual(few, many)
+
+    def test_list_reads_only_recipes(self):
+        """ Probar que el listado no lee las tablas intermedias """
+        recipe = self.create_recipes(3)
+        vegan = sample_tag(self.user, 'Vegan')
+        recipe.tags.add(vegan)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for query in ctx.captured_queries:
+            self.assertNotIn('core_recipe_tags', query['sql'])
+            self.assertNotIn('core_recipe_ingredients', query['sql'])
+        row = next(row for row in res.data['results'] if row['id'] == recipe.id)
+        self.assertEqual(row['tags'], sorted(recipe.tags.values_list('id', flat=True)))
+        self.assertEqual(row['ingredient_count'], 1)
+
+    def test_detail_query_count(self):
+        """ Probar que el detalle precarga tags e ingredientes """
+        recipe = self.create_recipes(1)
+        recipe.tags.add(sample_tag(self.user, 'Vegan'))
+        recipe.ingredients.add(sample_ingredient(self.user, 'Pepper'))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_recipe(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertEqual(len(res.data['ingredients']), 2)
+
+class RecipePaginationTests(TestCase):
+    """ Probar la paginacion por cursor de recetas """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@test.com', 'testpass')
+        self.client.force_authenticate(self.user)
+        self.recipes = [sample_recipe(self.user, title=f'Recipe {i}') for i in range(5)]
+
+    def test_follow_cursor_pages(self):
+        """ Probar recorrer todas las paginas con el cursor """
+        ids = []
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            ids.extend(item['id'] for item in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(ids, [recipe.id for recipe in self.recipes])
+
+    def test_page_size_capped(self):
+        """ Probar que el tamaño de pagina no supera el maximo """
+        with patch.object(RecipeCursorPagination, 'max_page_size', 3):
+            res = self.client.get(RECIPES_URL, {'page_size': 1000})
+
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        """ Probar que un cursor invalido retorna 404 """
+        res = self.client.get(RECIPES_URL, {'cursor': 'invalid'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+class RecipeBulkCreateTests(TestCase):
+    """ Probar la creacion de recetas en lote """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@test.com', 'testpass')
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_recipes(self):
+        """ Probar crear varias recetas con tags e ingredientes """
+        tag = sample_tag(self.user)
+        ingredient = sample_ingredient(self.user, 'Cheese')
+        payload = [
+            {'title': 'Pizza', 'time_minutes': 20, 'price': '5.00',
+             'tags': [tag.id], 'ingredients': [ingredient.id]},
+            {'title': 'Pasta', 'time_minutes': 15, 'price': '4.00', 'tags': [tag.id]},
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 2)
+        pizza = Recipe.objects.get(user=self.user, title='Pizza')
+        pasta = Recipe.objects.get(user=self.user, title='Pasta')
+        self.assertEqual(list(pizza.tags.all()), [tag])
+        self.assertEqual(list(pizza.ingredients.all()), [ingredient])
+        self.assertEqual(list(pasta.tags.all()), [tag])
+        self.assertEqual(res.data[0], RecipeSerializer(pizza).data)
+        self.assertEqual((pizza.tag_ids, pizza.ingredient_ids, pizza.ingredient_count), ([tag.id], [ingredient.id], 1))
+        self.assertEqual((pasta.ingredient_ids, pasta.ingredient_count), ([], 0))
+
+    def test_bulk_create_resolves_related_in_one_query(self):
+        """ Probar que los tags del lote se resuelven con una sola consulta """
+        tags = [sample_tag(self.user, f'tag {i}') for i in range(5)]
+        payload = [
+            {'title': f'Recipe {i}', 'time_minutes': 5, 'price': '1.00', 'tags': [tag.id]}
+            for i, tag in enumerate(tags)
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tag_lookups = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT "core_tag"."id" FROM')]
+        self.assertEqual(len(tag_lookups), 1)
+
+    def test_bulk_create_rejects_other_user_tag(self):
+        """ Probar que el lote falla completo con tags de otro usuario """
+        user2 = get_user_model().objects.create_user('other@test.com', 'testpass')
+        tag = sample_tag(user2)
+        payload = [
+            {'title': 'Pizza', 'time_minutes': 20, 'price': '5.00'},
+            {'title': 'Pasta', 'time_minutes': 15, 'price': '4.00', 'tags': [tag.id]},
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_create_rejects_out_of_range_ids(self):
+        """ Probar que ids que no caben en la columna retornan 400 y no un error del servidor """
+        for pk in (0, 2 ** 63, 2 ** 70):
+            payload = [{'title': 'Pizza', 'time_minutes': 20, 'price': '5.00', 'tags': [pk], 'ingredients': [pk]}]
+
+            res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('tags', res.data[0])
+            self.assertIn('ingredients', res.data[0])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+class RecipeFilterTests(TestCase):
+    """ Probar el filtrado de recetas por tags e ingredientes """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@test.com', 'testpass')
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(self.user, 'Vegan')
+        self.quick = sample_tag(self.user, 'Quick')
+        self.curry = sample_recipe(self.user, title='Curry')
+        self.curry.tags.add(self.vegan, self.quick)
+        self.salad = sample_recipe(self.user, title='Salad')
+        self.salad.tags.add(self.vegan)
+        self.steak = sample_recipe(self.user, title='Steak')
+
+    def get_titles(self, params):
+        """ Retorna los titulos de las recetas filtradas """
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_filter_by_any_tag(self):
+        """ Probar filtrar recetas con alguno de los tags sin duplicados """
+        titles = self.get_titles({'tags': f'{self.vegan.id},{self.quick.id}'})
+        self.assertEqual(titles, ['Curry', 'Salad'])
+
+    def test_filter_by_all_tags(self):
+        """ Probar filtrar recetas que tengan todos los tags """
+        titles = self.get_titles({'tags': f'{self.vegan.id},{self.quick.id}', 'match': 'all'})
+        self.assertEqual(titles, ['Curry'])
+
+    def test_filter_by_ingredients(self):
+        """ Probar filtrar recetas por ingredientes """
+        cheese = sample_ingredient(self.user, 'Cheese')
+        self.steak.ingredients.add(cheese)
+
+        titles = self.get_titles({'ingredients': str(cheese.id)})
+        self.assertEqual(titles, ['Steak'])
+
+    def test_filter_invalid_ids(self):
+        """ Probar que ids invalidos retornan 400 """
+        for value in ('abc', '0', '-1', '99999999999999999999'):
+            res = self.client.get(RECIPES_URL, {'tags': value})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_plan_flat_with_cardinality(self):
+        """ Probar que el filtro usa EXISTS y no crece con el numero de tags """
+        params = {'tags': ','.join(str(tag.id) for tag in (self.vegan, self.quick))}
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(RECIPES_URL, params)
+
+        extra = [sample_tag(self.user, f'tag {i}') for i in range(20)]
+        self.curry.tags.add(*extra)
+        params['tags'] += ',' + ','.join(str(tag.id) for tag in extra)
+        with CaptureQueriesContext(connection) as many:
+            titles = self.get_titles(params)
+
+        self.assertEqual(titles, ['Curry', 'Salad'])
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+        recipe_sql = [q['sql'] for q in many.captured_queries if q['sql'].startswith('SELECT "core_recipe"')]
+        self.assertIn('EXISTS', recipe_sql[0])
+        self.assertNotIn('DISTINCT', recipe_sql[0])
+
+class RecipeStreamingTests(TestCase):
+    """ Probar el listado de recetas como flujo NDJSON """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@test.com', 'testpass')
+        self.client.force_authenticate(self.user)
+        tag = sample_tag(self.user)
+        for i in range(5):
+            sample_recipe(self.user, title=f'Recipe {i}').tags.add(tag)
+
+    def read_stream(self, res):
+        """ Retorna los objetos de una respuesta NDJSON """
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        content = b''.join(res.streaming_content).decode('utf-8')
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_stream_with_query_param(self):
+        """ Probar listar recetas con ?stream=1 """
+        rows = self.read_stream(self.client.get(RECIPES_URL, {'stream': 1}))
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(rows, json.loads(json.dumps(RecipeSerializer(recipes, many=True).data)))
+
+    def test_stream_with_accept_header(self):
+        """ Probar listar recetas pidiendo application/x-ndjson """
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(len(self.read_stream(res)), 5)
+
+    @override_settings(RECIPE_STREAM_CHUNK_SIZE=2)
+    def test_stream_prefetches_per_chunk(self):
+        """ Probar que se precargan las relaciones expandidas una vez por bloque """
+        with CaptureQueriesContext(connection) as ctx:
+            rows = self.read_stream(self.client.get(RECIPES_URL, {'stream': 1, 'expand': 'tags,ingredients'}))
+
+        self.assertEqual(len(rows), 5)
+        # Una consulta de recetas y dos de relaciones por cada uno de los 3 bloques
+        self.assertEqual(len(ctx.captured_queries), 1 + 3 * 2)
+
+    def test_stream_reads_only_recipes(self):
+        """ Probar que el flujo toma los ids de las columnas desnormalizadas """
+        with CaptureQueriesContext(connection) as ctx:
+            rows = self.read_stream(self.client.get(RECIPES_URL, {'stream': 1}))
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+class RecipeSparseFieldsTests(TestCase):
+    """ Probar ?fields= y ?expand= en las recetas """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@test.com', 'testpass')
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(self.user)
+        self.recipe.tags.add(sample_tag(self.user))
+        self.recipe.ingredients.add(sample_ingredient(self.user))
+
+    def test_list_sparse_fields(self):
+        """ Probar que ?fields limita la respuesta y la consulta """
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{'id': self.recipe.id, 'title': self.recipe.title}])
+        recipe_queries = [q['sql'] for q in ctx.captured_queries if 'core_recipe' in q['sql']]
+        self.assertEqual(len(recipe_queries), 1)
+        self.assertNotIn('price', recipe_queries[0])
+
+    def test_detail_sparse_fields(self):
+        """ Probar que ?fields funciona en el detalle y omite relaciones no pedidas """
+        with self.assertNumQueries(2):
+            res = self.client.get(detail_recipe(self.recipe.id), {'fields': 'title,tags'})
+
+        self.assertEqual(set(res.data), {'title', 'tags'})
+        self.assertEqual(res.data['tags'][0]['name'], 'Main course')
+
+    def test_unknown_field(self):
+        """ Probar que un campo desconocido es rechazado """
+        res = self.client.get(RECIPES_URL, {'fields': 'id,user'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_expand(self):
+        """ Probar que ?expand anida los tags sin consultas extra """
+        for i in range(3):
+            sample_recipe(self.user, title=f'Recipe {i}').tags.add(sample_tag(self.user, f'Tag {i}'))
+
+        res = self.client.get(RECIPES_URL, {'expand': 'tags'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first = res.data['results'][0]
+        self.assertEqual(first['tags'], [{'id': self.recipe.tags.get().id, 'name': 'Main course'}])
+        self.assertEqual(first['ingredients'], [self.recipe.ingredients.get().id])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPES_URL, {'expand': 'tags,ingredients', 'page_size': 2})
+        few = len(ctx.captured_queries)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPES_URL, {'expand': 'tags,ingredients', 'page_size': 4})
+        self.assertEqual(len(ctx.captured_queries), few)
+
+    def test_unknown_expand(self):
+        """ Probar que solo se expanden tags e ingredientes """
+        res = self.client.get(RECIPES_URL, {'expand': 'user'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stream_sparse_fields(self):
+        """ Probar que el flujo NDJSON respeta ?fields """
+        res = self.client.get(RECIPES_URL, {'stream': 1, 'fields': 'id'})
+        content = b''.join(res.streaming_content).decode('utf-8')
+        self.assertEqual([json.loads(line) for line in content.splitlines()], [{'id': self.recipe.id}])
+
+class RecipeSearchTests(TestCase):
+    """ Probar la busqueda de recetas por texto """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@test.com', 'testpass')
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        """ Retorna los titulos encontrados en orden """
+        res = self.client.get(RECIPES_SEARCH_URL, {'q': query, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_title_without_accents(self):
+        """ Probar que la busqueda ignora acentos y mayusculas """
+        sample_recipe(self.user, title='Pollo al limón')
+        sample_recipe(self.user, title='Tarta de manzana')
+
+        self.assertEqual(self.search('LIMON'), ['Pollo al limón'])
+        self.assertEqual(self.search('limón pollo'), ['Pollo al limón'])
+        self.assertEqual(self.search('manz'), ['Tarta de manzana'])
+
+    def test_search_ingredients(self):
+        """ Probar que se buscan los ingredientes y se reindexan al cambiar """
+        recipe = sample_recipe(self.user, title='Ensalada')
+        ingredient = sample_ingredient(self.user, name='Aguacate')
+        recipe.ingredients.add(ingredient)
+        self.assertEqual(self.search('aguacate'), ['Ensalada'])
+
+        ingredient.name = 'Tomate'
+        ingredient.save()
+        self.assertEqual(self.search('aguacate'), [])
+        self.assertEqual(self.search('tomate'), ['Ensalada'])
+
+        ingredient.recipe_set.clear()
+        self.assertEqual(self.search('tomate'), [])
+
+        recipe.ingredients.add(ingredient)
+        ingredient.delete()
+        self.assertEqual(self.search('tomate'), [])
+
+    def test_search_ranks_title_first(self):
+        """ Probar que una coincidencia en el titulo va primero """
+        by_ingredient = sample_recipe(self.user, title='Sopa')
+        by_ingredient.ingredients.add(sample_ingredient(self.user, name='Queso'))
+        sample_recipe(self.user, title='Queso fundido')
+
+        self.assertEqual(self.search('queso'), ['Queso fundido', 'Sopa'])
+
+    def test_search_limited_to_user(self):
+        """ Probar que solo se buscan las recetas del usuario """
+        other = get_user_model().objects.create_user('other@test.com', 'testpass')
+        sample_recipe(other, title='Paella')
+        sample_recipe(self.user, title='Paella valenciana').delete()
+
+        self.assertEqual(self.search('paella'), [])
+
+    def test_search_bulk_created(self):
+        """ Probar que las recetas creadas en lote quedan indexadas """
+        payload = [{'title': 'Gazpacho', 'time_minutes': 10, 'price': '2.00'}]
+        self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(self.search('gazpacho'), ['Gazpacho'])
+
+    def test_search_operators_escaped(self):
+        """ Probar que los operadores del usuario no rompen la consulta """
+        sample_recipe(self.user, title='Arroz con leche')
+
+        self.assertEqual(self.search('"arroz" OR NEAR( -leche*'), [])
+        self.assertEqual(self.search('arroz "leche"'), ['Arroz con leche'])
+
+    @override_settings(RECIPE_SEARCH_MAX_RESULTS=2)
+    def test_search_filters_before_limit(self):
+        """ Probar que los filtros se aplican antes de limitar los resultados """
+        for i in range(3):
+            sample_recipe(self.user, title=f'Pollo asado {i}')
+        stew = sample_recipe(self.user, title='Guiso')
+        stew.ingredients.add(sample_ingredient(self.user, name='Pollo'))
+        tag = sample_tag(self.user, name='Invierno')
+        stew.tags.add(tag)
+
+        self.assertNotIn('Guiso', self.search('pollo'))
+        self.assertEqual(self.search('pollo', tags=tag.id), ['Guiso'])
+        self.assertEqual(self.search('pollo', tags=tag.id, fields='title'), ['Guiso'])
+
+    def test_search_requires_query(self):
+        """ Probar que la busqueda requiere ?q """
+        res = self.client.get(RECIPES_SEARCH_URL, {'q': ' ! '})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+class RecipeRelatedNamesTests(TestCase):
+    """ Probar crear recetas con tags e ingredientes por nombre """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@test.com', 'testpass')
+        self.client.force_authenticate(self.user)
+
+    def test_create_with_names_and_ids(self):
+        """ Probar que se aceptan nombres e ids y se crean los que faltan """
+        vegan = sample_tag(self.user, 'Vegan')
+        salt = sample_ingredient(self.user, 'Salt')
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '7.00',
+            'tags': [vegan.id, 'Dinner', 'Vegan'],
+            'ingredients': ['Salt', 'Rice', 'Coconut milk'],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(sorted(tag.name for tag in recipe.tags.all()), ['Dinner', 'Vegan'])
+        self.assertEqual(
+            sorted(ingredient.name for ingredient in recipe.ingredients.all()),
+            ['Coconut milk', 'Rice', 'Salt']
+        )
+        self.assertIn(salt, recipe.ingredients.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(sorted(res.data['tags']), sorted(tag.id for tag in recipe.tags.all()))
+
+    def test_names_resolved_in_bulk(self):
+        """ Probar que la cantidad de nombres no cambia el numero de consultas """
+        def create(names):
+            payload = {'title': 'Soup', 'time_minutes': 5, 'price': '1.00', 'tags': names, 'ingredients': []}
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(ctx.captured_queries)
+
+        few = create(['a', 'b'])
+        many = create(['c', 'd', 'e', 'f', 'g', 'a'])
+        self.assertEqual(few, many)
+
+    def test_write_bumps_and_reindexes_once(self):
+        """ Probar que crear o modificar una receta con nombres nuevos incrementa la version y reindexa una vez """
+        def writes(method, url, payload):
+            with CaptureQueriesContext(connection) as ctx:
+                res = getattr(self.client, method)(url, payload, format='json')
+            self.assertIn(res.status_code, (status.HTTP_200_OK, status.HTTP_201_CREATED))
+            statements = [query['sql'] for query in ctx.captured_queries]
+            for prefix in ('UPDATE "core_dataversion"', 'DELETE FROM core_recipe_search'):
+                self.assertEqual(len([sql for sql in statements if sql.startswith(prefix)]), 1, prefix)
+            return res.data
+
+        salt = sample_ingredient(self.user, 'Salt')
+        data = writes('post', RECIPES_URL, {
+            'title': 'Soup', 'time_minutes': 5, 'price': '1.00', 'tags': ['Vegan'], 'ingredients': [salt.id]
+        })
+        vegan = Tag.objects.get(user=self.user, name='Vegan')
+        self.assertEqual((data['tags'], data['ingredients'], data['ingredient_count']), ([vegan.id], [salt.id], 1))
+
+        data = writes('patch', detail_recipe(data['id']), {'title': 'Sopa', 'tags': ['Quick', 'Vegan']})
+        quick = Tag.objects.get(user=self.user, name='Quick')
+        self.assertEqual(data['tags'], sorted([vegan.id, quick.id]))
+        recipe = Recipe.objects.get(pk=data['id'])
+        self.assertEqual(recipe.tag_ids, sorted([vegan.id, quick.id]))
+        self.assertEqual(recipe.change_seq, quick.change_seq)
+
+    def test_other_user_id_rejected(self):
+        """ Probar que no se pueden asignar tags de otro usuario """
+        other = get_user_model().objects.create_user('other@test.com', 'testpass')
+        tag = sample_tag(other, 'Private')
+        payload = {'title': 'Soup', 'time_minutes': 5, 'price': '1.00', 'tags': [tag.id], 'ingredients': []}
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+    def test_unusual_ids_and_names(self):
+        """ Probar que un digito no ASCII es un nombre y un id fuera de rango es invalido """
+        payload = {'title': 'Soup', 'time_minutes': 5, 'price': '1.00', 'tags': ['\u00b2'], 'ingredients': []}
+        res = self.client.post(RECIPES_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Tag.objects.filter(user=self.user, name='\u00b2').exists())
+
+        for pk in (0, -1, 2 ** 64, str(2 ** 64)):
+            payload['tags'] = [pk]
+            res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_with_names(self):
+        """ Probar actualizar los tags por nombre """
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(sample_tag(self.user, 'Old'))
+
+        res = self.client.patch(detail_recipe(recipe.id), {'tags': ['New']}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag.name for tag in recipe.tags.all()], ['New'])
+
+    def test_concurrent_creation(self):
+        """ Probar que un nombre creado por otra peticion entre validar y guardar se reutiliza """
+        serializer = RecipeSerializer(
+            data={'title': 'Soup', 'time_minutes': 5, 'price': '1.00', 'tags': ['Race'], 'ingredients': []},
+            context={'request': Mock(user=self.user)}
+        )
+        self.assertTrue(serializer.is_valid())
+        tag = sample_tag(self.user, 'Race')
+
+        recipe = serializer.save(user=self.user)
+
+        self.assertEqual(list(recipe.tags.all()), [tag])
@@ -5,7 +5,7 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
-from core.models import Tag
+from core.models import Tag, Recipe
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
@@ -39,7 +39,7 @@ class PrivateTagsApiTest(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """ Probar que los tags retornados son del usuarios """
@@ -50,8 +50,8 @@ class PrivateTagsApiTest(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_user_successful(self):
         """ Prueba creando nuevo tag """
@@ -69,6 +69,36 @@ class PrivateTagsApiTest(TestCase):
         payload = {'name':''}
         res = self.client.post(TAGS_URL, payload)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
-        
 
+    def test_tags_paginated_by_name(self):
+        """ Probar que los tags se paginan en orden alfabetico """
+        for name in ('Vegan', 'Dessert', 'Breakfast'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        self.assertEqual([tag['name'] for tag in res.data['results']], ['Breakfast', 'Dessert'])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual([tag['name'] for tag in res.data['results']], ['Vegan'])
+        self.assertIsNone(res.data['next'])
 
+    def test_create_tag_duplicate_name(self):
+        """ Prueba que no se puede repetir el nombre de un tag """
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user, name='Vegan').count(), 1)
+
+    def test_retrieve_tags_assigned_only(self):
+        """ Prueba filtrar tags asignados a recetas """
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        for title in ('Eggs', 'Toast'):
+            recipe = Recipe.objects.create(user=self.user, title=title, time_minutes=5, price=1.00)
+            recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], TagSerializer([tag], many=True).data)
@@ -1,46 +1,247 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Tag, Ingredient, Recipe
-from recipe.serializers import RecipeImageSerializer, TagSerializer, IngredientSerializer, RecipeSerializer, RecipeDetailSerializer
+from core.authentication import CachedTokenAuthentication
+from core.db import read_from_replica
+from core.images import enqueue_image_job
+from core.models import MAX_ID, Tag, Ingredient, Recipe
+from core.parsers import OPTIONAL_PARSERS
+from core.renderers import OPTIONAL_RENDERERS
+from core.search import search_recipe_ids, search_terms
+from core.uploads import ImageUploadHandler
+from recipe.caching import ConditionalListMixin
+from recipe.changes import CursorExpired, changes_since
+from recipe.pagination import NameCursorPagination, RecipeCursorPagination
+from recipe.renderers import NDJSONRenderer
+from recipe.serializers import RecipeImageSerializer, TagSerializer, IngredientSerializer, RecipeSerializer, RecipeDetailSerializer, RecipeBulkSerializer
 
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
+class BaseRecipeAttrViewSet(ConditionalListMixin, viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
     """ Clase base """
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
+    pagination_class = NameCursorPagination
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + OPTIONAL_RENDERERS
+    parser_classes = tuple(api_settings.DEFAULT_PARSER_CLASSES) + OPTIONAL_PARSERS
+    recipe_relation = None
 
     def get_queryset(self):
         """ Retornar objetos para el usuario autenticado """
-        return self.queryset.filter(user=self.request.user).order_by('name')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.request.query_params.get('assigned_only') in ('1', 'true'):
+            through = getattr(Recipe, self.recipe_relation).through
+            column = f'{self.queryset.model._meta.model_name}_id'
+            queryset = queryset.filter(
+                Exists(through.objects.filter(**{column: OuterRef('pk')}))
+            )
+
+        return queryset.order_by('name')
     
     def perform_create(self, serializer):
         """ Creando nuevo ingrediente y tag """
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            raise ValidationError({'name': [_('An object with this name already exists.')]})
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """ Manejar los tags en la base de datos """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    recipe_relation = 'tags'
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """ Manejar los Ingredientes en la base de datos """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    recipe_relation = 'ingredients'
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """ Manejar las recetas """
     serializer_class = RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
+    pagination_class = RecipeCursorPagination
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (NDJSONRenderer, ) + OPTIONAL_RENDERERS
+    parser_classes = tuple(api_settings.DEFAULT_PARSER_CLASSES) + OPTIONAL_PARSERS
 
     def get_queryset(self):
         """ Retornar objetos para el usuario autenticado """
-        return self.queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+        queryset = self.filter_related(queryset, 'tags', 'tag_id')
+        queryset = self.filter_related(queryset, 'ingredients', 'ingredient_id')
+        if self.get_sparse_fields() is not None:
+            queryset = queryset.only(*self.get_loaded_columns())
+        return queryset.prefetch_related(*self.get_prefetches())
+
+    def get_sparse_fields(self):
+        """ Campos pedidos con ?fields=id,title en lecturas, o None para todos """
+        value = self.request.query_params.get('fields')
+        if not value or self.action not in ('list', 'retrieve', 'search'):
+            return None
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = sorted(set(fields) - set(self.get_serializer_class().Meta.fields))
+        if unknown:
+            raise ValidationError({'fields': [_('Unknown field "{name}".').format(name=name) for name in unknown]})
+        return fields
+
+    def get_expand(self):
+        """ Relaciones a anidar en el listado con ?expand=tags,ingredients """
+        value = self.request.query_params.get('expand')
+        if not value or self.action not in ('list', 'search'):
+            return []
+        expand = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = sorted(set(expand) - set(RecipeSerializer.expandable_fields))
+        if unknown:
+            raise ValidationError({'expand': [_('Cannot expand "{name}".').format(name=name) for name in unknown]})
+        return expand
+
+    def get_loaded_columns(self):
+        """ Columnas de la receta que necesitan los campos pedidos """
+        serializer = self.get_serializer()
+        columns = []
+        for field in serializer.fields.values():
+            try:
+                model_field = Recipe._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                columns.append(model_field.name)
+            elif self.uses_summaries() and getattr(field, 'summary', None):
+                columns.append(field.summary)
+        return columns
+
+    def uses_summaries(self):
+        """ Listados y escrituras leen los ids de tags e ingredientes de las columnas desnormalizadas """
+        # Al escribir, recipe_changes deja esas columnas de la instancia al dia antes de responder
+        return self.action in ('list', 'search', 'create', 'update', 'partial_update')
+
+    def get_serializer_context(self):
+        """ Agrega los campos pedidos y las relaciones expandidas """
+        context = super().get_serializer_context()
+        if self.request is not None:
+            context['fields'] = self.get_sparse_fields()
+            context['expand'] = self.get_expand()
+            context['summaries'] = self.uses_summaries()
+        return context
+
+    def _params_to_ints(self, name):
+        """ Convierte una lista de ids separados por coma en enteros """
+        value = self.request.query_params.get(name)
+        if not value:
+            return []
+        try:
+            ids = [int(str_id) for str_id in value.split(',')]
+        except ValueError:
+            ids = None
+        # Los ids fuera del rango de la columna hacen fallar la consulta
+        if not ids or not all(0 < pk <= MAX_ID for pk in ids):
+            raise ValidationError({name: [_('Expected a comma separated list of ids.')]})
+        return ids
+
+    def filter_related(self, queryset, field_name, column):
+        """ Filtra recetas por tags o ingredientes usando EXISTS sobre la tabla intermedia """
+        ids = self._params_to_ints(field_name)
+        if not ids:
+            return queryset
+
+        through = getattr(Recipe, field_name).through.objects
+        if self.request.query_params.get('match') == 'all':
+            for pk in set(ids):
+                queryset = queryset.filter(
+                    Exists(through.filter(recipe_id=OuterRef('pk'), **{column: pk}))
+                )
+            return queryset
+
+        return queryset.filter(
+            Exists(through.filter(recipe_id=OuterRef('pk'), **{f'{column}__in': ids}))
+        )
+
+    def get_prefetches(self):
+        """ Retorna los prefetch de ingredientes y tags segun la accion """
+        if self.action == 'upload_image':
+            return ()
+
+        fields = self.get_sparse_fields()
+        expand = self.get_expand()
+        prefetches = []
+        for name, model in (('ingredients', Ingredient), ('tags', Tag)):
+            if fields is not None and name not in fields:
+                continue
+            if self.action == 'retrieve' or name in expand:
+                prefetches.append(Prefetch(name, queryset=model.objects.all()))
+            elif self.uses_summaries():
+                continue
+            else:
+                # Los serializadores planos solo necesitan los ids de las relaciones
+                prefetches.append(Prefetch(name, queryset=model.objects.only('id')))
+        return prefetches
+
+    def list(self, request, *args, **kwargs):
+        """ Listar recetas, por paginas o como flujo NDJSON """
+        if self.is_streaming():
+            with read_from_replica():
+                return self.stream_list()
+        # Las paginas se guardan con la ETag de la version del primario: una replica
+        # atrasada dejaria datos viejos bajo la version nueva hasta la siguiente escritura
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """ Detalle de una receta leido desde la replica """
+        with read_from_replica():
+            return super().retrieve(request, *args, **kwargs)
+
+    def is_streaming(self):
+        """ El cliente pide ?stream=1 o el tipo application/x-ndjson """
+        return (
+            self.request.query_params.get('stream') in ('1', 'true')
+            or isinstance(self.request.accepted_renderer, NDJSONRenderer)
+        )
+
+    def iterate_chunks(self, queryset, chunk_size):
+        """ Recorre el queryset por bloques precargando las relaciones de cada bloque """
+        rows = queryset.prefetch_related(None).iterator(chunk_size=chunk_size)
+        prefetches = self.get_prefetches()
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            prefetch_related_objects(chunk, *prefetches)
+            yield chunk
+
+    def stream_list(self):
+        """ Serializar las recetas una por una sin construir la respuesta en memoria """
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        # El flujo se consume fuera de read_from_replica, fijar la base de datos ahora
+        queryset = queryset.using(queryset.db)
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        renderer = NDJSONRenderer()
+        chunk_size = getattr(settings, 'RECIPE_STREAM_CHUNK_SIZE', 500)
+
+        def lines():
+            for chunk in self.iterate_chunks(queryset, chunk_size):
+                yield b''.join(
+                    renderer.render_row(serializer_class(recipe, context=context).data)
+                    for recipe in chunk
+                )
+
+        return StreamingHttpResponse(lines(), content_type=renderer.media_type)
 
     def get_serializer_class(self):
         """ Retorna clase de serializador apropiada """
@@ -48,6 +249,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeDetailSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
+        elif self.action == 'bulk_create':
+            return RecipeBulkSerializer
         
         return self.serializer_class
 
@@ -55,17 +258,57 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """ Creando receta """
         serializer.save(user=self.request.user)
 
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk_create(self, request):
+        """ Crear varias recetas en una sola transaccion """
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.save(user=request.user)
+
+        queryset = self.get_queryset().filter(id__in=[recipe.id for recipe in recipes]).order_by('id')
+        return Response(
+            RecipeSerializer(queryset, many=True, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(methods=['GET'], detail=False, url_path='search')
+    def search(self, request):
+        """ Buscar recetas por titulo e ingredientes, ordenadas por relevancia """
+        query = request.query_params.get('q', '')
+        if not search_terms(query):
+            raise ValidationError({'q': [_('This query parameter is required.')]})
+
+        with read_from_replica():
+            queryset = self.filter_queryset(self.get_queryset())
+            limit = getattr(settings, 'RECIPE_SEARCH_MAX_RESULTS', 50)
+            ids = search_recipe_ids(request.user.pk, query, limit, using=queryset.db, queryset=queryset)
+            recipes = queryset.in_bulk(ids)
+            serializer = self.get_serializer(
+                [recipes[pk] for pk in ids if pk in recipes], many=True
+            )
+            return Response({'results': serializer.data})
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """ Subir imagenes a recetas """
         recipe = self.get_object()
+        # La imagen se valida y se escribe a disco por bloques mientras llega
+        handler = ImageUploadHandler(request)
+        request.upload_handlers = [handler]
         serializer = self.get_serializer(
             recipe,
             data=request.data
         )
+        if handler.errors:
+            return Response(
+                {field: [message] for field, message in handler.errors.items()},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         if serializer.is_valid():
-            serializer.save()
+            # Las rendiciones se generan fuera de la peticion
+            recipe = serializer.save(image_renditions={})
+            enqueue_image_job(recipe)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -73,4 +316,33 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(
             serializer.errors,
             status= status.HTTP_400_BAD_REQUEST
-        )
\ No newline at end of file
+        )
+
+
+class ChangesView(APIView):
+    """ Tags, ingredientes y recetas modificados o eliminados desde un cursor """
+    authentication_classes = (CachedTokenAuthentication, )
+    permission_classes = (IsAuthenticated, )
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + OPTIONAL_RENDERERS
+
+    def get(self, request):
+        # Se lee de la base principal: con el retraso de una replica el cursor saltaria cambios
+        try:
+            changes, cursor, has_more = changes_since(request.user, request.query_params.get('since'))
+        except ValueError:
+            raise ValidationError({'since': [_('Invalid cursor.')]})
+        except CursorExpired:
+            return Response(
+                {'detail': _('The cursor has expired, fetch the full catalog again.')},
+                status=status.HTTP_410_GONE
+            )
+
+        context = {'request': request, 'summaries': True}
+        return Response({
+            'tags': TagSerializer(changes['tags'], many=True).data,
+            'ingredients': IngredientSerializer(changes['ingredients'], many=True).data,
+            'recipes': RecipeSerializer(changes['recipes'], many=True, context=context).data,
+            'deleted': changes['deleted'],
+            'cursor': cursor,
+            'has_more': has_more,
+        })
@@ -1,9 +1,13 @@
+from unittest.mock import patch
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework.throttling import SimpleRateThrottle
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -15,6 +19,7 @@ def create_user(**params):
 class PublicUserApiTests(TestCase):
     """ Testear el API publico del usuario """
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
     
     def test_create_valid_user_success(self):
@@ -105,6 +110,42 @@ class PublicUserApiTests(TestCase):
         res = self.client.post(ME_URL)
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
+class LoginThrottleTests(TestCase):
+    """ Testear los limites de intentos de login """
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        create_user(email='test@datadosis.com', password='Testpass')
+
+    @patch.object(SimpleRateThrottle, 'THROTTLE_RATES', {'login_ip': '100/min', 'login_email': '2/min'})
+    def test_login_throttled_per_email(self):
+        """ Probar que se limitan los intentos sobre el mismo email """
+        payload = {'email': 'test@datadosis.com', 'password': 'wrong'}
+        for _ in range(2):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_URL, {'email': 'TEST@datadosis.com', 'password': 'Testpass'})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.client.post(TOKEN_URL, {'email': 'other@datadosis.com', 'password': 'wrong'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch.object(SimpleRateThrottle, 'THROTTLE_RATES', {'login_ip': '2/min', 'login_email': '100/min'})
+    def test_login_throttled_per_ip(self):
+        """ Probar que se limitan los intentos desde la misma IP """
+        for i in range(2):
+            self.client.post(TOKEN_URL, {'email': f'user{i}@datadosis.com', 'password': 'wrong'})
+
+        res = self.client.post(TOKEN_URL, {'email': 'test@datadosis.com', 'password': 'Testpass'})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_login_malformed_body(self):
+        """ Probar que un email que no es texto o un cuerpo que no es objeto retornan 400 """
+        for payload in ({'email': 123, 'password': 'wrong'}, ['test@datadosis.com']):
+            res = self.client.post(TOKEN_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
 class PrivateUserApiTests(TestCase):
     """ Testear el API privado del usuario """
     def setUp(self):
@@ -0,0 +1,24 @@
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginIPRateThrottle(SimpleRateThrottle):
+    """ Limita los intentos de login por direccion IP """
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginEmailRateThrottle(SimpleRateThrottle):
+    """ Limita los intentos de login por email, sin importar la IP """
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        # Corre antes de validar: un cuerpo o email mal formado lo rechaza el serializador
+        email = request.data.get('email') if isinstance(request.data, dict) else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        ident = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -1,6 +1,9 @@
 from user.serializers import UserSerializer, AuthTokenSerializer
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
+
+from core.authentication import CachedTokenAuthentication
+from user.throttling import LoginEmailRateThrottle, LoginIPRateThrottle
 
 from rest_framework.settings import api_settings
 
@@ -12,11 +15,13 @@ class CreateTokenView(ObtainAuthToken):
     """ Crear un nuevo auth token para el usuario """
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    throttle_classes = (LoginIPRateThrottle, LoginEmailRateThrottle)
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """ Manejar el usuario autenticado """
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (permissions.IsAuthenticated, )
 
     def get_object(self):